@@ -4,27 +4,99 @@ Handles SQLite database operations for persistent storage
 """
 
 import sqlite3
+import threading
+import time
+import numpy as np
 import pandas as pd
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional
 
+from utils import load_history_csv
+
+# Columns written by the CSV migration (the CSVs' RUL column maps to `rul`)
+SENSOR_COLUMNS = ['pressure_A', 'flow_A', 'corrosion_A', 'acoustic_A', 'temperature_A',
+                  'pressure_B', 'flow_B', 'corrosion_B', 'acoustic_B', 'temperature_B']
+
+# Segments are stored as small integer keys (lookup table `segments`) rather
+# than repeating 'A-B' text in every row and index entry
+SEGMENT_KEYS = {'A-B': 1, 'B-C': 2, 'C-D': 3, 'D-E': 4}
+
+# NumPy dtypes for sensor_data columns when returned as arrays (others stay object)
+COLUMN_DTYPES = {'id': np.int64, 'day': np.int64,
+                 **{col: np.float64 for col in SENSOR_COLUMNS + ['rul', 'health_score']}}
+
+INSERT_COLUMNS = ['segment_id', 'day', 'date'] + SENSOR_COLUMNS + ['rul', 'health_score']
+
+# Connection tuning: WAL lets history reads run alongside inserts, NORMAL sync
+# skips the per-commit fsync (still durable at checkpoints under WAL), and a
+# larger page cache / mmap keep the history scans in memory
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-20000',      # ~20 MB
+    'PRAGMA mmap_size=134217728',    # 128 MB
+    'PRAGMA busy_timeout=5000',      # ms
+)
+
+INSERT_SQL = f'''
+    INSERT OR REPLACE INTO sensor_data
+    ({', '.join(INSERT_COLUMNS)}, data_source)
+    VALUES ({', '.join('?' * len(INSERT_COLUMNS))}, 'simulation')
+'''
+
+
+# Live inserts are queued and written in batches: an insert flushes the queue
+# once WRITE_BUFFER_ROWS rows are pending or its oldest row has waited
+# WRITE_FLUSH_INTERVAL seconds (reads and close() flush whatever is left)
+WRITE_BUFFER_ROWS = 100
+WRITE_FLUSH_INTERVAL = 1.0
+
 class PHealthDatabase:
-    def __init__(self, db_path='p_health.db'):
+    def __init__(self, db_path='p_health.db', write_buffer_rows=WRITE_BUFFER_ROWS,
+                 flush_interval=WRITE_FLUSH_INTERVAL):
         self.db_path = db_path
         self.conn = None
+        # The connection is shared across FastAPI handlers (check_same_thread=False)
+        self._write_lock = threading.Lock()
+        self._write_buf = []  # queued INSERT_SQL parameter tuples
+        self._write_buf_since = 0.0  # time.monotonic() of the oldest queued row
+        self.write_buffer_rows = write_buffer_rows  # 1 writes every row through
+        self.flush_interval = flush_interval
         self.initialize_database()
     
     def initialize_database(self):
         """Create database and tables if they don't exist"""
         self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            self.conn.execute(pragma)
         cursor = self.conn.cursor()
         
+        # Create segments lookup table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS segments (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        ''')
+        cursor.executemany(
+            "INSERT OR IGNORE INTO segments (id, name) VALUES (?, ?)",
+            [(key, name) for name, key in SEGMENT_KEYS.items()]
+        )
+        
+        # Databases created before the segments table keep TEXT segment ids;
+        # move that table aside and copy it over once the new one exists
+        columns = {row[1]: row[2] for row in cursor.execute("PRAGMA table_info(sensor_data)")}
+        legacy = columns.get('segment_id', '').upper() == 'TEXT'
+        if legacy:
+            cursor.execute("ALTER TABLE sensor_data RENAME TO sensor_data_legacy")
+        
         # Create sensor_data table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS sensor_data (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                segment_id TEXT NOT NULL,
+                segment_id INTEGER NOT NULL REFERENCES segments(id),
                 day INTEGER NOT NULL,
                 date TEXT NOT NULL,
                 pressure_A REAL,
@@ -45,17 +117,59 @@ class PHealthDatabase:
             )
         ''')
         
+        if legacy:
+            self._migrate_legacy_rows(cursor)
+        
         # Create index for faster queries
         cursor.execute('''
             CREATE INDEX IF NOT EXISTS idx_segment_day 
             ON sensor_data(segment_id, day)
         ''')
         
+        # Covering index for get_history: every selected column lives in the
+        # index, so the history query never has to visit the table rows
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_segment_day_cover
+            ON sensor_data(segment_id, day DESC, date, health_score, rul, corrosion_A)
+        ''')
+        
         self.conn.commit()
+        self._segment_keys = dict(cursor.execute("SELECT name, id FROM segments"))
         print(f"Database initialized: {self.db_path}")
     
+    def _migrate_legacy_rows(self, cursor):
+        """Copy rows from a TEXT-segment sensor_data table into the integer-keyed one"""
+        cursor.execute(
+            "INSERT OR IGNORE INTO segments (name) SELECT DISTINCT segment_id FROM sensor_data_legacy"
+        )
+        columns = ', '.join(['id', 'day', 'date'] + SENSOR_COLUMNS +
+                            ['rul', 'health_score', 'data_source', 'created_at'])
+        cursor.execute(f'''
+            INSERT INTO sensor_data (segment_id, {columns})
+            SELECT segments.id, {', '.join('legacy.' + c for c in columns.split(', '))}
+            FROM sensor_data_legacy legacy JOIN segments ON segments.name = legacy.segment_id
+        ''')
+        # Dropping the old table also drops its indexes, freeing their names
+        cursor.execute("DROP TABLE sensor_data_legacy")
+        print("Migrated sensor_data to integer segment ids")
+    
+    def _segment_key(self, segment_id, create=False):
+        """Integer key for a segment name (registered on first write if create=True).
+        
+        create=True must be called with _write_lock held: the registration is
+        its own committed transaction on the shared connection.
+        """
+        key = self._segment_keys.get(segment_id)
+        if key is None and create:
+            with self.conn:
+                self.conn.execute("INSERT OR IGNORE INTO segments (name) VALUES (?)", (segment_id,))
+            key = self.conn.execute("SELECT id FROM segments WHERE name = ?", (segment_id,)).fetchone()[0]
+            self._segment_keys[segment_id] = key
+        return key
+    
     def load_csv_data(self, data_dir):
         """Load CSV files into database (one-time migration)"""
+        self.flush()
         cursor = self.conn.cursor()
         
         # Check if data already loaded
@@ -83,43 +197,47 @@ class PHealthDatabase:
                 print(f"Warning: {filepath} not found, skipping...")
                 continue
             
-            df = pd.read_csv(filepath)
+            # Flattened sensor columns, served from the Parquet cache when fresh
+            df = load_history_csv(filepath)
+            df = df[['day'] + SENSOR_COLUMNS].assign(rul=df['RUL'])
             
-            # Add date column
-            df['date'] = [(start_date + timedelta(days=int(d)-1)).strftime('%Y-%m-%d') 
-                          for d in df['day']]
-            df['segment_id'] = segment_id
-            df['data_source'] = 'simulation'
+            # Add date column (day 1 = start_date)
+            df['date'] = pd.to_datetime(df['day'] - 1, unit='D', origin=start_date).dt.strftime('%Y-%m-%d')
+            with self._write_lock:
+                df['segment_id'] = self._segment_key(segment_id, create=True)
             
-            # Calculate health score
-            df['health_score'] = df['RUL'].apply(lambda x: min(100, max(0, (x / 14000) * 100)))
+            # Calculate health score (linear RUL mapping, clipped to 0-100)
+            df['health_score'] = np.clip(df['rul'].to_numpy(dtype=np.float64) / 14000.0 * 100.0, 0.0, 100.0)
             
-            # Insert into database
-            df.to_sql('sensor_data', self.conn, if_exists='append', index=False,
-                     dtype={'segment_id': 'TEXT', 'day': 'INTEGER', 'date': 'TEXT',
-                            'rul': 'REAL', 'health_score': 'REAL', 'data_source': 'TEXT'})
+            # Insert into database: one prepared statement bound to every row,
+            # committed as a single transaction (tolist() yields sqlite-bindable
+            # Python scalars rather than NumPy ones)
+            rows = list(zip(*(df[col].tolist() for col in INSERT_COLUMNS)))
+            with self._write_lock, self.conn:
+                self.conn.executemany(INSERT_SQL, rows)
             
             print(f"Loaded {len(df)} rows for segment {segment_id}")
         
+        # Refresh planner statistics so the covering index is picked
+        self.conn.execute("ANALYZE")
         self.conn.commit()
         print("CSV data loaded successfully!")
     
     def get_latest_day(self, segment_id):
         """Get the latest day number for a segment"""
-        cursor = self.conn.cursor()
-        cursor.execute(
+        self.flush()  # make queued inserts visible
+        result = self.conn.execute(
             "SELECT MAX(day) FROM sensor_data WHERE segment_id = ?",
-            (segment_id,)
-        )
-        result = cursor.fetchone()[0]
+            (self._segment_key(segment_id),)
+        ).fetchone()[0]
         return result if result else 0
     
     def get_data_by_day(self, segment_id, day):
         """Get sensor data for a specific day"""
-        cursor = self.conn.cursor()
-        cursor.execute(
+        self.flush()  # make queued inserts visible
+        cursor = self.conn.execute(
             "SELECT * FROM sensor_data WHERE segment_id = ? AND day = ?",
-            (segment_id, day)
+            (self._segment_key(segment_id), day)
         )
         row = cursor.fetchone()
         
@@ -127,71 +245,89 @@ class PHealthDatabase:
             return None
         
         columns = [desc[0] for desc in cursor.description]
-        return dict(zip(columns, row))
+        data = dict(zip(columns, row))
+        data['segment_id'] = segment_id  # callers see the segment name, not its key
+        return data
     
     def get_history(self, segment_id, days=180):
         """Get historical data for a segment"""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            """SELECT day, date, health_score as score, rul, corrosion_A as corrosion
-               FROM sensor_data 
-               WHERE segment_id = ? 
-               ORDER BY day DESC 
-               LIMIT ?""",
-            (segment_id, days)
+        self.flush()  # make queued inserts visible
+        # Inner query takes the newest N rows off the covering index; the outer
+        # ORDER BY hands them back oldest first
+        cursor = self.conn.execute(
+            """SELECT day, date, score, rul, corrosion FROM (
+                   SELECT day, date, health_score as score, rul, corrosion_A as corrosion
+                   FROM sensor_data 
+                   WHERE segment_id = ? 
+                   ORDER BY day DESC 
+                   LIMIT ?
+               ) ORDER BY day ASC""",
+            (self._segment_key(segment_id), days)
         )
         
         rows = cursor.fetchall()
         columns = [desc[0] for desc in cursor.description]
         
-        # Convert to list of dicts and reverse (oldest first)
-        data = [dict(zip(columns, row)) for row in rows]
-        return list(reversed(data))
+        return [dict(zip(columns, row)) for row in rows]
     
     def get_last_n_days(self, segment_id, n=90):
         """Get last N days of data for feature engineering"""
-        cursor = self.conn.cursor()
-        cursor.execute(
+        # DataFrame view over the columnar result, for FeatureEngineer
+        return pd.DataFrame(self.get_last_n_days_arrays(segment_id, n))
+    
+    def get_last_n_days_arrays(self, segment_id, n=90):
+        """Get last N days as {column: NumPy array}, oldest first"""
+        self.flush()  # make queued inserts visible
+        cursor = self.conn.execute(
             """SELECT * FROM sensor_data 
                WHERE segment_id = ? 
                ORDER BY day DESC 
                LIMIT ?""",
-            (segment_id, n)
+            (self._segment_key(segment_id), n)
         )
         
         rows = cursor.fetchall()
         columns = [desc[0] for desc in cursor.description]
+        values = zip(*rows) if rows else [()] * len(columns)
         
-        df = pd.DataFrame(rows, columns=columns)
-        return df.sort_values('day').reset_index(drop=True)
+        arrays = {col: np.array(vals, dtype=COLUMN_DTYPES.get(col, object))
+                  for col, vals in zip(columns, values)}
+        arrays['segment_id'] = np.full(len(rows), segment_id, dtype=object)
+        
+        # Rows arrive newest first; reorder by day with an argsort on the tiny int column
+        order = np.argsort(arrays['day'], kind='stable')
+        return {col: arr[order] for col, arr in arrays.items()}
     
     def insert_day_data(self, segment_id, day, date, sensor_data, rul, health_score):
-        """Insert new day's data"""
-        cursor = self.conn.cursor()
+        """Queue new day's data (written in batches, see flush)"""
+        values = (day, date, *(sensor_data.get(col, 0) for col in SENSOR_COLUMNS),
+                  rul, health_score)
         
-        cursor.execute('''
-            INSERT OR REPLACE INTO sensor_data 
-            (segment_id, day, date, pressure_A, flow_A, corrosion_A, acoustic_A, temperature_A,
-             pressure_B, flow_B, corrosion_B, acoustic_B, temperature_B, rul, health_score, data_source)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'simulation')
-        ''', (
-            segment_id, day, date,
-            sensor_data.get('pressure_A', 0),
-            sensor_data.get('flow_A', 0),
-            sensor_data.get('corrosion_A', 0),
-            sensor_data.get('acoustic_A', 0),
-            sensor_data.get('temperature_A', 0),
-            sensor_data.get('pressure_B', 0),
-            sensor_data.get('flow_B', 0),
-            sensor_data.get('corrosion_B', 0),
-            sensor_data.get('acoustic_B', 0),
-            sensor_data.get('temperature_B', 0),
-            rul, health_score
-        ))
-        
-        self.conn.commit()
+        with self._write_lock:
+            now = time.monotonic()
+            if not self._write_buf:
+                self._write_buf_since = now
+            self._write_buf.append((self._segment_key(segment_id, create=True), *values))
+            if (len(self._write_buf) >= self.write_buffer_rows
+                    or now - self._write_buf_since >= self.flush_interval):
+                self._flush_locked()
+    
+    def flush(self):
+        """Write all queued day rows in a single transaction"""
+        with self._write_lock:
+            self._flush_locked()
+    
+    def _flush_locked(self):
+        if not self._write_buf:
+            return
+        # The transaction rolls back on error (e.g. "database is locked" past
+        # busy_timeout); the rows stay queued for the next flush
+        with self.conn:
+            self.conn.executemany(INSERT_SQL, self._write_buf)
+        self._write_buf = []
     
     def close(self):
         """Close database connection"""
         if self.conn:
+            self.flush()
             self.conn.close()
@@ -34,6 +34,24 @@ except Exception as e:
     print(f"Module initialization error: {e}")
 print("="*60 + "\n")
 
+# Connected /ws clients. A single broadcaster task builds each frame once and
+# fans it out, instead of every connection recomputing the same state.
+ws_clients = set()
+
+async def broadcast_state():
+    """Push the current state to all /ws clients every 2 seconds (or faster if sped up)."""
+    while True:
+        if ws_clients:
+            # Pre-encoded text frame: the frontend JSON.parse()s event.data, so no binary frames
+            payload = sim_manager.get_current_state_json()
+            clients = list(ws_clients)
+            results = await asyncio.gather(*(ws.send_text(payload) for ws in clients),
+                                           return_exceptions=True)
+            for ws, result in zip(clients, results):
+                if isinstance(result, Exception):
+                    ws_clients.discard(ws)
+        await asyncio.sleep(2.0 / sim_manager.speed_multiplier if sim_manager.speed_multiplier > 0 else 1.0)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
@@ -41,6 +59,7 @@ async def lifespan(app: FastAPI):
     try:
         # Start the background simulation loop
         asyncio.create_task(sim_manager.run_loop(ml_service))
+        asyncio.create_task(broadcast_state())
         print("Lifespan: Background loop started")
     except Exception as e:
         print(f"Lifespan Failed: {e}")
@@ -101,18 +120,24 @@ async def stream_data():
     """Legacy polling endpoint (optional)."""
     return sim_manager.get_current_state()
 
-# WebSocket for Real-Time 2s Updates
+# WebSocket for Real-Time 2s Updates (frames are pushed by broadcast_state)
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     try:
+        # First frame right away so the dashboard doesn't wait for the next tick
+        await websocket.send_text(sim_manager.get_current_state_json())
+        ws_clients.add(websocket)
+        # Clients never send anything; just wait for the disconnect
         while True:
-            # Push updates every 2 seconds (or faster if sped up)
-            data = sim_manager.get_current_state()
-            await websocket.send_json(data)
-            await asyncio.sleep(2.0 / sim_manager.speed_multiplier if sim_manager.speed_multiplier > 0 else 1.0)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
     except WebSocketDisconnect:
-        print("Client disconnected")
+        pass
+    finally:
+        ws_clients.discard(websocket)
+    print("Client disconnected")
 
 # --- Legacy / Compatibility Shims (Fixes 404s & connection fallbacks) ---
 
@@ -137,4 +162,13 @@ if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     # In production, reload should be False for performance
     is_dev = os.getenv("RAILWAY_ENVIRONMENT") is None
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=is_dev)
+    # uvloop event loop + httptools parser (both in uvicorn[standard]); uvloop
+    # has no Windows build, so fall back to the stock asyncio loop there
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=is_dev, workers=1,
+                loop=loop, http="httptools", ws="websockets",
+                timeout_keep_alive=30)
@@ -0,0 +1,42 @@
+"""
+Model Registry for P-Health Backend
+Loads the trained RUL model and (legacy) feature scaler once per process and shares them
+"""
+
+import os
+from functools import lru_cache
+
+import joblib
+import xgboost as xgb
+
+# ml_pipeline/models, relative to this file (same place run_pipeline.py saves to)
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models")
+
+
+def model_path(model_dir: str = MODEL_DIR) -> str:
+    """The saved model file: native rul_model.ubj, else the legacy pickled rul_model.pkl"""
+    ubj_path = os.path.join(model_dir, "rul_model.ubj")
+    return ubj_path if os.path.exists(ubj_path) else os.path.join(model_dir, "rul_model.pkl")
+
+
+@lru_cache(maxsize=1)
+def get_model(model_dir: str = MODEL_DIR):
+    """Trained RUL regressor (see model_path), deserialized on first use"""
+    path = model_path(model_dir)
+    if path.endswith(".ubj"):
+        # Only the trees are stored, no pickled sklearn wrapper to rebuild
+        model = xgb.XGBRegressor()
+        model.load_model(path)
+        return model
+    # mmap_mode maps any large NumPy arrays in the pickle instead of copying them
+    return joblib.load(path, mmap_mode="r")
+
+
+@lru_cache(maxsize=1)
+def get_scaler(model_dir: str = MODEL_DIR):
+    """Fitted feature scaler (feature_scaler.pkl), deserialized on first use.
+    
+    None for models trained on unscaled features, whose feature_scaler.pkl
+    is an empty placeholder; only legacy models ship a fitted scaler.
+    """
+    return joblib.load(os.path.join(model_dir, "feature_scaler.pkl"), mmap_mode="r")
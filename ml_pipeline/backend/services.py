@@ -1,15 +1,35 @@
 import os
 import pandas as pd
 import numpy as np
-import joblib
 import json
 import time
 from typing import Dict, List, Optional
 import sys
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# orjson is optional: C-implemented JSON encoding for the WebSocket frames
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Import utility functions
-from utils import format_rul_display, get_realistic_drivers, get_segment_summary, calculate_health_score
+from utils import (format_rul_display_batch, get_realistic_drivers, get_segment_summary,
+                   calculate_health_score_batch, load_history_csv)
+from model_registry import get_model, get_scaler, model_path as saved_model_path
+
+# Per-day columns kept for each scenario (besides 'day'); float64 so values reach
+# the JSON responses exactly as they appear in the CSVs
+SCENARIO_COLUMNS = ('RUL', 'health_score', 'pressure_A', 'flow_A', 'corrosion_A',
+                    'temperature_A', 'acoustic_A')
+
+
+def encode_json(data) -> str:
+    """Serialize a response payload to a JSON string (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(data)
 
 
 # Hack to import from sibling src directory
@@ -31,12 +51,12 @@ class MLService:
         
     def load_models(self):
         """Load XGBoost model and Scaler from disk."""
-        model_path = os.path.join(self.model_dir, "rul_model.pkl")
-        scaler_path = os.path.join(self.model_dir, "feature_scaler.pkl")
+        model_path = saved_model_path(self.model_dir)
         
         print(f"Loading Model from {model_path}...")
-        self.model = joblib.load(model_path)
-        self.scaler = joblib.load(scaler_path)
+        # Shared, load-once instances (see model_registry)
+        self.model = get_model(self.model_dir)
+        self.scaler = get_scaler(self.model_dir)
         
         # Initialize Feature Engineer logic
         self.feature_engineer = FeatureEngineer()
@@ -46,6 +66,10 @@ class MLService:
         # For now, we rely on FeatureEngineer to produce consistent columns.
         print("ML Models Loaded Successfully.")
 
+    def _model_input(self, X):
+        """Features as the model expects them: scaled only for legacy models saved with a fitted scaler."""
+        return X if self.scaler is None else self.scaler.transform(X)
+
     def predict_rul(self, daily_aggregated_data: pd.DataFrame) -> float:
         """
         Predict RUL given a single row of DAILY aggregated data.
@@ -77,13 +101,13 @@ class MLService:
             train_cols = [c for c in current_features.columns if c not in ['scenario_id', 'day', 'date', 'RUL']]
             X = current_features[train_cols].values
             
-            if X.shape[1] != self.scaler.n_features_in_:
-                print(f"Feature Mismatch! Expected {self.scaler.n_features_in_}, Got {X.shape[1]}")
+            if X.shape[1] != self.model.n_features_in_:
+                print(f"Feature Mismatch! Expected {self.model.n_features_in_}, Got {X.shape[1]}")
                 # Try to auto-fix/pad or fail safely
                 return 0.0
                 
-            # 3. Scale
-            X_scaled = self.scaler.transform(X)
+            # 3. Scale (legacy models only)
+            X_scaled = self._model_input(X)
             
             # 4. Predict
             rul = self.model.predict(X_scaled)[0]
@@ -102,7 +126,8 @@ class MLService:
 class SimulationManager:
     def __init__(self, data_dir):
         self.data_dir = data_dir
-        self.scenarios = {} # {'A-B': df, 'B-C': df}
+        self.scenarios = {} # {'A-B': {'day': int32[], 'RUL': float64[], ...}, ...}
+        self.day_index = {} # {'A-B': {day: row position}} for O(1) current-day lookups
         self.current_day = 180
         self.speed_multiplier = 1.0 # 1 sec = 1 day logic? No, 2s ticks.
         # Logic: 
@@ -113,6 +138,11 @@ class SimulationManager:
         self.running = True
         self.last_update_time = time.time()
         
+        # (day, snapshot) - health only changes when current_day advances
+        self._health_cache = (None, None)
+        # ((day, timestamp), encoded get_current_state) - shared by all /ws clients
+        self._state_json_cache = (None, None)
+        
     def load_scenarios(self):
         """Load the 4 Golden CSVs."""
         files = {
@@ -125,99 +155,101 @@ class SimulationManager:
         print(f"LOADING CSV FILES FROM: {self.data_dir}")
         print(f"{'='*60}")
         
-        for seg, filename in files.items():
-            path = os.path.join(self.data_dir, filename)
-            if os.path.exists(path):
-                df = pd.read_csv(path)
-                self.scenarios[seg] = df
+        paths = {seg: os.path.join(self.data_dir, filename) for seg, filename in files.items()}
+        found = {seg: path for seg, path in paths.items() if os.path.exists(path)}
+        
+        # Read the files concurrently: CSV/Parquet parsing releases the GIL.
+        # Sensor JSON is parsed once here (or read pre-flattened from the
+        # Parquet cache), so the per-tick handlers only index typed arrays
+        with ThreadPoolExecutor(max_workers=max(1, len(found))) as pool:
+            frames = dict(zip(found, pool.map(load_history_csv, found.values())))
+        
+        for seg, path in paths.items():
+            if seg in frames:
+                df = frames[seg].sort_values('day', kind='stable').reset_index(drop=True)
+                
+                # Score every day once
+                df['health_score'] = calculate_health_score_batch(df['RUL'].to_numpy(), seg)
+                
+                # Keep a struct-of-arrays per segment: the handlers read single
+                # elements, which is far cheaper on raw NumPy than through pandas
+                arrays = {'day': df['day'].to_numpy(dtype=np.int32)}
+                for col in SCENARIO_COLUMNS:
+                    arrays[col] = df[col].to_numpy(dtype=np.float64)
+                self.scenarios[seg] = arrays
+                self.day_index[seg] = {day: pos for pos, day in enumerate(arrays['day'].tolist())}
                 
                 # DEBUG: Show RUL range
-                rul_min = df['RUL'].min()
-                rul_max = df['RUL'].max()
-                day180_rul = df[df['day']==180]['RUL'].values[0] if len(df[df['day']==180]) > 0 else 'N/A'
+                rul_min = arrays['RUL'].min()
+                rul_max = arrays['RUL'].max()
+                day180_pos = self.day_index[seg].get(180)
+                day180_rul = arrays['RUL'][day180_pos] if day180_pos is not None else 'N/A'
                 
-                print(f"[OK] Loaded {seg}: {len(df)} rows")
+                print(f"[OK] Loaded {seg}: {len(arrays['day'])} rows")
                 print(f"  RUL range: {rul_min:.1f} - {rul_max:.1f} days")
                 print(f"  Day 180 RUL: {day180_rul}")
             else:
                 print(f"[ERROR] Warning: {path} not found.")
         
+        self.invalidate_cache()
         print(f"{'='*60}\n")
 
     def get_history(self, segment_id):
         """Get history up to current_day."""
         if segment_id not in self.scenarios: return None
-        df = self.scenarios[segment_id]
-        # Return only up to current_day
-        mask = df['day'] <= self.current_day
+        arrays = self.scenarios[segment_id]
+        # Return only up to current_day (days are sorted at load, so this is a binary search)
+        end = int(np.searchsorted(arrays['day'], self.current_day, side='right'))
         # Limit to last 180 days for UI
-        subset = df[mask].tail(180)
+        window = slice(max(0, end - 180), end)
         
         # Format for Recharts: [{day: 'Day 1', score: 98}, ...]
-        result = []
-        for _, row in subset.iterrows():
-            # Convert RUL to Health Score using segment-specific calculation
-            score = calculate_health_score(row['RUL'], segment_id)
-            
-            # Parse corrosion from sensor_a JSON
-            try:
-                import ast
-                sensor_a_str = str(row.get('sensor_a', '{}'))
-                sensor_a = ast.literal_eval(sensor_a_str) if sensor_a_str != 'nan' else {}
-                corrosion_val = sensor_a.get('corrosion', 0)
-            except:
-                corrosion_val = 0
-            
-            result.append({
-                "day": f"Day {int(row['day'])}",
-                "score": round(float(score), 1),
-                "rul": round(float(row['RUL']), 1), 
-                "corrosion": round(float(corrosion_val), 4)
-            })
-        return result
+        days = arrays['day'][window].tolist()
+        scores = arrays['health_score'][window].tolist()
+        ruls = arrays['RUL'][window].tolist()
+        corrosion = arrays['corrosion_A'][window].tolist()
+        
+        return [
+            {
+                "day": f"Day {day}",
+                "score": round(score, 1),
+                "rul": round(rul, 1),
+                "corrosion": round(corr, 4)
+            }
+            for day, score, rul, corr in zip(days, scores, ruls, corrosion)
+        ]
+
+    def _day_position(self, segment_id):
+        """Array position of current_day via the day index, or the last row once the data runs out."""
+        return self.day_index[segment_id].get(int(self.current_day), -1)
 
     def get_latest_health(self):
         """Get snapshot of all segments at current_day with enhanced data."""
+        # Memoized per day: the WebSocket polls far more often than the day advances
+        cached_day, cached_snapshot = self._health_cache
+        if cached_day == self.current_day:
+            return cached_snapshot
+        
+        # Find row for current_day (falls back to the last row if simulation ended)
+        positions = {seg: self._day_position(seg) for seg in self.scenarios}
+        
+        # Format every segment's RUL for display in one call
+        ruls = [float(self.scenarios[seg]['RUL'][pos]) for seg, pos in positions.items()]
+        rul_infos = format_rul_display_batch(ruls)
+        
         snapshot = {}
-        for seg, df in self.scenarios.items():
-            # Find row for current_day
-            row = df[df['day'] == int(self.current_day)]
-            if row.empty:
-                # If simulation ended, take last
-                row = df.iloc[[-1]]
-            
-            # Extract raw RUL
-            rul_raw = float(row['RUL'].values[0])
+        for (seg, pos), rul_raw, rul_info in zip(positions.items(), ruls, rul_infos):
+            arrays = self.scenarios[seg]
             
-            # Format RUL for display
-            rul_info = format_rul_display(rul_raw)
-            
-            # Calculate health score (segment-specific)
-            score = calculate_health_score(rul_raw, seg)
+            # Health score (segment-specific), already computed for every day at load
+            score = float(arrays['health_score'][pos])
             
             # Get sensor data for driver calculation
-            row_data = row.iloc[0]
-            
-            # Parse sensor data from JSON string
-            try:
-                import json
-                import ast
-                sensor_a_str = str(row_data['sensor_a'])
-                # Try to parse as dict (it's stored as string representation of dict)
-                sensor_a = ast.literal_eval(sensor_a_str) if sensor_a_str != 'nan' else {}
-                
-                sensor_data = {
-                    'pressure_A': float(sensor_a.get('pressure', 0)),
-                    'flow_A': float(sensor_a.get('flow', 0)),
-                    'corrosion_A': float(sensor_a.get('corrosion', 0))
-                }
-            except Exception as e:
-                # Fallback to default values if parsing fails
-                sensor_data = {
-                    'pressure_A': 0.0,
-                    'flow_A': 0.0,
-                    'corrosion_A': 0.0
-                }
+            sensor_data = {
+                'pressure_A': float(arrays['pressure_A'][pos]),
+                'flow_A': float(arrays['flow_A'][pos]),
+                'corrosion_A': float(arrays['corrosion_A'][pos])
+            }
             
             # Get realistic drivers for this segment
             drivers_list = get_realistic_drivers(seg, int(self.current_day), sensor_data)
@@ -244,6 +276,8 @@ class SimulationManager:
                 "last_updated": summary_info['last_updated'],
                 "data_source": summary_info['data_source']
             }
+        
+        self._health_cache = (self.current_day, snapshot)
         return snapshot
 
     def safe_float(self, val, default=0.0):
@@ -258,33 +292,22 @@ class SimulationManager:
         """Return the RAW sensor readings for the current moment (simulated)."""
         # This streams the 'Day' row as if it were a 2-second live tick.
         readings = {}
-        for seg, df in self.scenarios.items():
-            row = df[df['day'] == int(self.current_day)]
-            if row.empty:
-                row = df.iloc[[-1]]
-            
-            row_data = row.iloc[0]
-            
-            # Parse sensor data from JSON
-            try:
-                import ast
-                sensor_a_str = str(row_data.get('sensor_a', '{}'))
-                sensor_a = ast.literal_eval(sensor_a_str) if sensor_a_str != 'nan' else {}
-            except:
-                sensor_a = {}
-            
-            # Get latest health info for summary and status
-            latest_health_snapshot = self.get_latest_health()
+        
+        # Get latest health info for summary and status (once, shared by all segments)
+        latest_health_snapshot = self.get_latest_health()
+        
+        for seg, arrays in self.scenarios.items():
+            pos = self._day_position(seg)
             segment_health_info = latest_health_snapshot.get(seg, {})
             
             readings[seg] = {
                 "day": int(self.current_day),
-                "rul": float(row_data['RUL']),
-                "pressure": self.safe_float(sensor_a.get('pressure', 0)),
-                "flow": self.safe_float(sensor_a.get('flow', 0)),
-                "corrosion": self.safe_float(sensor_a.get('corrosion', 0)),
-                "temperature": self.safe_float(sensor_a.get('temperature', 0)),
-                "vibration": self.safe_float(sensor_a.get('acoustic', 0)),
+                "rul": float(arrays['RUL'][pos]),
+                "pressure": self.safe_float(arrays['pressure_A'][pos]),
+                "flow": self.safe_float(arrays['flow_A'][pos]),
+                "corrosion": self.safe_float(arrays['corrosion_A'][pos]),
+                "temperature": self.safe_float(arrays['temperature_A'][pos]),
+                "vibration": self.safe_float(arrays['acoustic_A'][pos]),
                 "summary": segment_health_info.get('summary', 'N/A'),
                 "status": segment_health_info.get('status_detail', 'N/A')
             }
@@ -293,9 +316,20 @@ class SimulationManager:
             "timestamp": time.strftime("%H:%M:%S"),
             "day_index": int(self.current_day),
             "segments": readings,
-            "system_health": self.get_latest_health()
+            "system_health": latest_health_snapshot
         }
 
+    def get_current_state_json(self):
+        """get_current_state() encoded as JSON, built at most once per (day, second)."""
+        key = (self.current_day, time.strftime("%H:%M:%S"))
+        cached_key, cached_json = self._state_json_cache
+        if cached_key == key:
+            return cached_json
+        
+        encoded = encode_json(self.get_current_state())
+        self._state_json_cache = (key, encoded)
+        return encoded
+
     async def run_loop(self, ml_service):
         """Background loop to advance time."""
         while True:
@@ -309,6 +343,8 @@ class SimulationManager:
                 # Loop back if end of data
                 if self.current_day > 730:
                     self.current_day = 180 # Loop back to start of demo
+                
+                self.invalidate_cache()
                     
                 # In a real system, here we would:
                 # 1. Get new 2s tick.
@@ -321,9 +357,15 @@ class SimulationManager:
     def set_speed(self, speed):
         self.speed_multiplier = speed
 
+    def invalidate_cache(self):
+        """Drop memoized per-day results (call whenever current_day or the data changes)."""
+        self._health_cache = (None, None)
+        self._state_json_cache = (None, None)
+
     def reset(self):
         self.current_day = 180
         self.running = True
+        self.invalidate_cache()
         
     def get_status(self):
         return "Running" if self.running else "Paused"
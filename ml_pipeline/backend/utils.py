@@ -3,9 +3,80 @@ Utility functions for P-Health Backend
 Handles RUL formatting, driver attribution, and data transformations
 """
 
-from datetime import datetime, timedelta
+import ast
+import json
+import math
+import os
+import time
+from datetime import date, datetime
+from functools import lru_cache, partial
 from typing import Dict, List, Tuple
 import numpy as np
+import pandas as pd
+
+# pyarrow is optional: without it histories are parsed by pandas and never cached
+try:
+    import pyarrow.csv as pacsv
+    HAS_PYARROW = True
+except ImportError:
+    pacsv = None
+    HAS_PYARROW = False
+
+# orjson is optional: faster C parser for the sensor dict strings
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# numba is optional: without it the scalar health score helper runs as plain Python
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        return lambda fn: fn
+
+# Fields stored in the stringified `sensor_a` / `sensor_b` dict columns of the history CSVs
+SENSOR_FIELDS = ('pressure', 'flow', 'corrosion', 'temperature', 'acoustic')
+
+# RUL display tiers, bucketed with np.searchsorted (side='left') so each tier
+# covers (edge[i-1], edge[i]] days, matching the original if/elif ladder
+_RUL_EDGES = np.array([30, 90, 365, 730, 1825, 3650])
+_RUL_CATEGORIES = np.array(["URGENT", "Critical", "Warning", "Caution", "Fair", "Good", "Excellent"])
+_RUL_COLORS = np.array(["rose", "rose", "orange", "amber", "amber", "emerald", "emerald"])
+_RUL_URGENCY = np.array(["critical", "critical", "high", "medium", "medium", "low", "low"])
+_RUL_UNIT_DAYS = np.array([1, 30, 30, 365, 365, 365, 365])
+_RUL_UNIT_TEXT = ("days", "months", "months", "year", "years", "years")  # by tier, Excellent is fixed
+# Same tiers as plain tuples for the scalar path: (category, color, urgency, unit, unit_days)
+_RUL_TIERS = tuple(zip(_RUL_CATEGORIES.tolist(), _RUL_COLORS.tolist(), _RUL_URGENCY.tolist(),
+                       _RUL_UNIT_TEXT + ("years",), _RUL_UNIT_DAYS.tolist()))
+_MONTH_ABBR = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+# Local wall clock, refreshed at most once per second:
+# [epoch_seconds, "YYYY-mm-dd HH:MM:SS", date ordinal, fraction of the day elapsed]
+_clock_cache = [0, '', 0, 0.0]
+
+
+def _clock() -> list:
+    t = int(time.time())
+    if t != _clock_cache[0]:
+        now = datetime.fromtimestamp(t)
+        _clock_cache[:] = [t, now.strftime("%Y-%m-%d %H:%M:%S"), now.toordinal(),
+                           (now.hour * 3600 + now.minute * 60 + now.second) / 86400]
+    return _clock_cache
+
+
+def _now_ts_str() -> str:
+    """Current local time as "%Y-%m-%d %H:%M:%S", formatted at most once per second"""
+    return _clock()[1]
+
+
+def _expected_month(rul_days: float) -> str:
+    """Month and year ("%b %Y") of now + rul_days, from day ordinals instead of datetime + timedelta"""
+    _, _, today, day_fraction = _clock()
+    expected = date.fromordinal(today + math.floor(day_fraction + rul_days))
+    return f"{_MONTH_ABBR[expected.month - 1]} {expected.year}"
+
 
 def format_rul_display(rul_days: float) -> Dict[str, any]:
     """
@@ -17,65 +88,211 @@ def format_rul_display(rul_days: float) -> Dict[str, any]:
     Returns:
         Dict with category, display_text, expected_date, confidence_band
     """
-    # Tiered categories
-    if rul_days > 3650:  # > 10 years
-        category = "Excellent"
-        display_text = "10+ years"
-        color = "emerald"
-        urgency = "low"
-    elif rul_days > 1825:  # 5-10 years
-        category = "Good"
-        display_text = f"{int(rul_days/365)} years"
-        color = "emerald"
-        urgency = "low"
-    elif rul_days > 730:  # 2-5 years
-        category = "Fair"
-        display_text = f"{int(rul_days/365)} years"
-        color = "amber"
-        urgency = "medium"
-    elif rul_days > 365:  # 1-2 years
-        category = "Caution"
-        display_text = f"{int(rul_days/365)} year" + ("s" if rul_days > 730 else "")
-        color = "amber"
-        urgency = "medium"
-    elif rul_days > 90:  # 3-12 months
-        category = "Warning"
-        display_text = f"{int(rul_days/30)} months"
-        color = "orange"
-        urgency = "high"
-    elif rul_days > 30:  # 1-3 months
-        category = "Critical"
-        display_text = f"{int(rul_days/30)} months"
-        color = "rose"
-        urgency = "critical"
-    else:  # < 1 month
-        category = "URGENT"
-        display_text = f"{int(rul_days)} days"
-        color = "rose"
-        urgency = "critical"
+    category, display_text, exact_days, color, urgency, lower, upper = _rul_display_fields(float(rul_days))
     
-    # Calculate expected failure date
-    expected_date = (datetime.now() + timedelta(days=rul_days)).strftime("%b %Y")
-    
-    # Confidence band (±5% for demo)
-    confidence_lower = int(rul_days * 0.95)
-    confidence_upper = int(rul_days * 1.05)
+    # Calculate expected failure date (time-dependent, so never cached)
+    expected_date = _expected_month(rul_days)
     
     return {
         "category": category,
         "display_text": display_text,
-        "exact_days": int(rul_days),
+        "exact_days": exact_days,
         "expected_date": expected_date,
         "color": color,
         "urgency": urgency,
         "confidence_range": {
-            "lower": confidence_lower,
-            "upper": confidence_upper,
+            "lower": lower,
+            "upper": upper,
             "percentage": 95
         }
     }
 
 
+@lru_cache(maxsize=4096)
+def _rul_display_fields(rul_days: float) -> Tuple:
+    """Time-independent part of format_rul_display, memoized on the exact RUL value"""
+    # searchsorted's default side='left' gives the same (edge[i-1], edge[i]] tiers
+    tier = int(np.searchsorted(_RUL_EDGES, rul_days))
+    category, color, urgency, unit, unit_days = _RUL_TIERS[tier]
+    display_text = "10+ years" if tier == len(_RUL_EDGES) else f"{int(rul_days / unit_days)} {unit}"
+    
+    # Confidence band (±5% for demo)
+    return (category, display_text, int(rul_days), color, urgency,
+            int(rul_days * 0.95), int(rul_days * 1.05))
+
+
+def format_rul_display_batch(rul_days: np.ndarray) -> List[Dict[str, any]]:
+    """
+    format_rul_display for an array of RUL values
+    
+    Each value goes through the same memoized tier lookup and expected-month
+    rule as the scalar path, so both give identical dicts.
+    
+    Args:
+        rul_days: Array of remaining useful life values in days
+        
+    Returns:
+        List of display dicts, one per input value
+    """
+    return [format_rul_display(rul) for rul in np.asarray(rul_days, dtype=np.float64).tolist()]
+
+
+# Driver lists per segment history. They are static, so they're built once here;
+# get_realistic_drivers hands out new lists holding these (read-only) dicts.
+
+# A-B: GOOD/NORMAL - Excellent condition
+_DRIVERS_AB = (
+    {
+        "name": "Minimal Corrosion",
+        "impact": 12,
+        "severity": "low",
+        "details": "Corrosion rate: 0.0005 mm/y (excellent)",
+        "trend": "stable",
+        "timeline": "━━━━━━━━━━",
+        "color": "emerald"
+    },
+    {
+        "name": "Stable Pressure",
+        "impact": 8,
+        "severity": "low",
+        "details": "Pressure variance: ±0.1 bar (optimal)",
+        "trend": "stable",
+        "timeline": "━━━━━━━━━━",
+        "color": "emerald"
+    },
+)
+
+# B-C: DISTURBED - Early warning signs, gradual degradation
+_DRIVERS_BC = (
+    {
+        "name": "Moderate Corrosion Buildup",
+        "impact": 48,
+        "severity": "medium",
+        "details": "Corrosion rate: 0.008 mm/y (↑20% from baseline)",
+        "trend": "rising",
+        "timeline": "━━━━━━╱╱╱",
+        "color": "amber"
+    },
+    {
+        "name": "Pressure Fluctuations",
+        "impact": 32,
+        "severity": "medium",
+        "details": "Daily cycles ±0.4 bar (pump scheduling issues)",
+        "trend": "fluctuating",
+        "timeline": "━━≈≈≈≈≈≈",
+        "color": "amber"
+    },
+    {
+        "name": "Flow Irregularities",
+        "impact": 25,
+        "severity": "low",
+        "details": "Flow variance: ±5% (minor blockage suspected)",
+        "trend": "gradual",
+        "timeline": "━━━━━━━╱╱",
+        "color": "amber"
+    },
+)
+
+# C-D: BAD - Critical failure scenario (after the Day 160 surge)
+_DRIVERS_CD_LATE = (
+    {
+        "name": "Pressure Surge Event",
+        "impact": 82,
+        "severity": "critical",
+        "details": "Day 160: Spike from 5.2→7.8 bar (+50%)",
+        "trend": "spike",
+        "timeline": "━━━━━━━╱╱╱╱",
+        "color": "rose",
+        "event_day": 160
+    },
+    {
+        "name": "Severe Corrosion",
+        "impact": 75,
+        "severity": "critical",
+        "details": "Rate quadrupled: 0.008→0.032 mm/y (+400%)",
+        "trend": "accelerating",
+        "timeline": "━━━━━╱╱╱╱╱",
+        "color": "rose"
+    },
+    {
+        "name": "Active Leak",
+        "impact": 68,
+        "severity": "critical",
+        "details": "Flow loss: 18% (major leak detected)",
+        "trend": "expanding",
+        "timeline": "━━━━━━╱╱╱╱",
+        "color": "rose"
+    },
+    {
+        "name": "Structural Failure",
+        "impact": 55,
+        "severity": "critical",
+        "details": "Wall thickness compromised, imminent rupture risk",
+        "trend": "critical",
+        "timeline": "━━━━━━━╱╱╱",
+        "color": "rose"
+    },
+)
+
+# C-D before the event - showing early signs
+_DRIVERS_CD_EARLY = (
+    {
+        "name": "Elevated Corrosion",
+        "impact": 35,
+        "severity": "medium",
+        "details": "Corrosion rate: 0.012 mm/y (above normal)",
+        "trend": "rising",
+        "timeline": "━━━━━━━╱╱",
+        "color": "amber"
+    },
+)
+
+# D-E: POOR - Significant wear and tear
+_DRIVERS_DE = (
+    {
+        "name": "High Fatigue Stress",
+        "impact": 52,
+        "severity": "high",
+        "details": "Pressure cycles: 1,800/month (excessive)",
+        "trend": "cyclic",
+        "timeline": "━━≈≈≈≈≈≈≈",
+        "color": "orange"
+    },
+    {
+        "name": "Elevated Corrosion",
+        "impact": 45,
+        "severity": "medium",
+        "details": "Corrosion rate: 0.018 mm/y (concerning)",
+        "trend": "steady",
+        "timeline": "━━━━━━━━╱╱",
+        "color": "orange"
+    },
+    {
+        "name": "Mechanical Wear",
+        "impact": 38,
+        "severity": "medium",
+        "details": "Vibration levels elevated, bearing degradation",
+        "trend": "increasing",
+        "timeline": "━━━━━━╱╱╱",
+        "color": "orange"
+    },
+    {
+        "name": "Temperature Stress",
+        "impact": 28,
+        "severity": "low",
+        "details": "Thermal cycling causing material fatigue",
+        "trend": "gradual",
+        "timeline": "━━━━━━━╱╱",
+        "color": "orange"
+    },
+)
+
+_DRIVERS = {"A-B": _DRIVERS_AB, "B-C": _DRIVERS_BC, "D-E": _DRIVERS_DE}
+
+# Day of the C-D pressure surge event
+_CD_EVENT_DAY = 160
+
+
 def get_realistic_drivers(segment_id: str, current_day: int, sensor_data: Dict) -> List[Dict]:
     """
     Generate realistic degradation drivers based on segment and current state
@@ -86,170 +303,14 @@ def get_realistic_drivers(segment_id: str, current_day: int, sensor_data: Dict)
     - C-D: Bad (critical failure)
     - D-E: Poor (significant wear)
     """
-    drivers = []
-    
-    if segment_id == "A-B":
-        # GOOD/NORMAL - Excellent condition
-        drivers = [
-            {
-                "name": "Minimal Corrosion",
-                "impact": 12,
-                "severity": "low",
-                "details": "Corrosion rate: 0.0005 mm/y (excellent)",
-                "trend": "stable",
-                "timeline": "━━━━━━━━━━",
-                "color": "emerald"
-            },
-            {
-                "name": "Stable Pressure",
-                "impact": 8,
-                "severity": "low",
-                "details": "Pressure variance: ±0.1 bar (optimal)",
-                "trend": "stable",
-                "timeline": "━━━━━━━━━━",
-                "color": "emerald"
-            }
-        ]
-    
-    elif segment_id == "B-C":
-        # DISTURBED - Early warning signs, gradual degradation
-        drivers = [
-            {
-                "name": "Moderate Corrosion Buildup",
-                "impact": 48,
-                "severity": "medium",
-                "details": f"Corrosion rate: 0.008 mm/y (↑20% from baseline)",
-                "trend": "rising",
-                "timeline": "━━━━━━╱╱╱",
-                "color": "amber"
-            },
-            {
-                "name": "Pressure Fluctuations",
-                "impact": 32,
-                "severity": "medium",
-                "details": "Daily cycles ±0.4 bar (pump scheduling issues)",
-                "trend": "fluctuating",
-                "timeline": "━━≈≈≈≈≈≈",
-                "color": "amber"
-            },
-            {
-                "name": "Flow Irregularities",
-                "impact": 25,
-                "severity": "low",
-                "details": "Flow variance: ±5% (minor blockage suspected)",
-                "trend": "gradual",
-                "timeline": "━━━━━━━╱╱",
-                "color": "amber"
-            }
-        ]
-    
-    elif segment_id == "C-D":
-        # BAD - Critical failure scenario
-        if current_day > 160:
-            drivers = [
-                {
-                    "name": "Pressure Surge Event",
-                    "impact": 82,
-                    "severity": "critical",
-                    "details": f"Day {160}: Spike from 5.2→7.8 bar (+50%)",
-                    "trend": "spike",
-                    "timeline": "━━━━━━━╱╱╱╱",
-                    "color": "rose",
-                    "event_day": 160
-                },
-                {
-                    "name": "Severe Corrosion",
-                    "impact": 75,
-                    "severity": "critical",
-                    "details": "Rate quadrupled: 0.008→0.032 mm/y (+400%)",
-                    "trend": "accelerating",
-                    "timeline": "━━━━━╱╱╱╱╱",
-                    "color": "rose"
-                },
-                {
-                    "name": "Active Leak",
-                    "impact": 68,
-                    "severity": "critical",
-                    "details": "Flow loss: 18% (major leak detected)",
-                    "trend": "expanding",
-                    "timeline": "━━━━━━╱╱╱╱",
-                    "color": "rose"
-                },
-                {
-                    "name": "Structural Failure",
-                    "impact": 55,
-                    "severity": "critical",
-                    "details": "Wall thickness compromised, imminent rupture risk",
-                    "trend": "critical",
-                    "timeline": "━━━━━━━╱╱╱",
-                    "color": "rose"
-                }
-            ]
-        else:
-            # Before event - showing early signs
-            drivers = [
-                {
-                    "name": "Elevated Corrosion",
-                    "impact": 35,
-                    "severity": "medium",
-                    "details": "Corrosion rate: 0.012 mm/y (above normal)",
-                    "trend": "rising",
-                    "timeline": "━━━━━━━╱╱",
-                    "color": "amber"
-                }
-            ]
-    
-    elif segment_id == "D-E":
-        # POOR - Significant wear and tear
-        drivers = [
-            {
-                "name": "High Fatigue Stress",
-                "impact": 52,
-                "severity": "high",
-                "details": "Pressure cycles: 1,800/month (excessive)",
-                "trend": "cyclic",
-                "timeline": "━━≈≈≈≈≈≈≈",
-                "color": "orange"
-            },
-            {
-                "name": "Elevated Corrosion",
-                "impact": 45,
-                "severity": "medium",
-                "details": "Corrosion rate: 0.018 mm/y (concerning)",
-                "trend": "steady",
-                "timeline": "━━━━━━━━╱╱",
-                "color": "orange"
-            },
-            {
-                "name": "Mechanical Wear",
-                "impact": 38,
-                "severity": "medium",
-                "details": "Vibration levels elevated, bearing degradation",
-                "trend": "increasing",
-                "timeline": "━━━━━━╱╱╱",
-                "color": "orange"
-            },
-            {
-                "name": "Temperature Stress",
-                "impact": 28,
-                "severity": "low",
-                "details": "Thermal cycling causing material fatigue",
-                "trend": "gradual",
-                "timeline": "━━━━━━━╱╱",
-                "color": "orange"
-            }
-        ]
-    
-    return drivers
+    if segment_id == "C-D":
+        return list(_DRIVERS_CD_LATE if current_day > _CD_EVENT_DAY else _DRIVERS_CD_EARLY)
+    return list(_DRIVERS.get(segment_id, ()))
 
 
-def get_segment_summary(segment_id: str, rul_info: Dict, drivers: List[Dict]) -> Dict:
-    """
-    Generate status and summary for a segment
-    History: A-B good, B-C disturbed, C-D bad, D-E poor
-    """
-    category = rul_info["category"]
-    
+@lru_cache(maxsize=64)
+def _segment_status(segment_id: str) -> Tuple[str, str, str]:
+    """(status, status_color, summary_text) for a segment; static per segment"""
     # Status mapping based on segment history
     if segment_id == "A-B":
         # GOOD/NORMAL
@@ -280,15 +341,77 @@ def get_segment_summary(segment_id: str, rul_info: Dict, drivers: List[Dict]) ->
         status_color = "slate"
         summary_text = "Operating within monitored parameters."
     
+    return status, status_color, summary_text
+
+
+def get_segment_summary(segment_id: str, rul_info: Dict, drivers: List[Dict]) -> Dict:
+    """
+    Generate status and summary for a segment
+    History: A-B good, B-C disturbed, C-D bad, D-E poor
+    """
+    status, status_color, summary_text = _segment_status(segment_id)
+    
     return {
         "status": status,
         "status_color": status_color,
         "summary": summary_text,
-        "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "last_updated": _now_ts_str(),
         "data_source": "simulation"
     }
 
 
+def _health_lut(points: List[Tuple[float, float]], slope: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (breakpoints, values) for np.interp from a piecewise-linear score curve
+    
+    np.interp clamps at both ends, which gives the flat floor on the left; a
+    far-right breakpoint on the last segment's slope keeps scores rising above
+    the top of the documented range, as the formulas did.
+    """
+    (x_last, y_last), far = points[-1], 1e9
+    bp = [x for x, _ in points] + [x_last + far]
+    vals = [y for _, y in points] + [y_last + far * slope]
+    return np.array(bp, dtype=np.float64), np.array(vals, dtype=np.float64)
+
+
+# Health score curves per segment (RUL days -> %), see calculate_health_score
+_HEALTH_LUT = {
+    # >90% for RUL 13,000-14,000 days, floor 85%
+    "A-B": _health_lut([(13000 * 85 / 90, 85), (13000, 90), (13500, 92)], slope=3 / 500),
+    # 75-85% for RUL 2,270-2,999 days, floor 65%
+    "B-C": _health_lut([(2270 * 65 / 75, 65), (2270, 75), (2500, 78), (2800, 82)], slope=3 / 200),
+    # 15-45% for RUL 10-599 days, floor 15%
+    "C-D": _health_lut([(0, 15), (50, 18), (100, 22), (200, 30), (400, 40)], slope=5 / 199),
+    # 55-65% for RUL 770-1,499 days, floor 45%
+    "D-E": _health_lut([(770 * 45 / 55, 45), (770, 55), (1000, 58), (1300, 62)], slope=3 / 199),
+}
+# Fallback: linear mapping clipped to 0-100%
+_HEALTH_LUT_DEFAULT = (np.array([0.0, 14000.0]), np.array([0.0, 100.0]))
+
+
+@njit(cache=True)
+def _interp_scalar(x, bp, vals):
+    """np.interp for one float (same clamping and arithmetic), without the array round trip"""
+    if x != x:
+        return x
+    if x < bp[0]:
+        return vals[0]
+    last = bp.shape[0] - 1
+    if x >= bp[last]:
+        return vals[last]
+    j = 0
+    while bp[j + 1] <= x:
+        j += 1
+    if x == bp[j]:
+        return vals[j]
+    slope = (vals[j + 1] - vals[j]) / (bp[j + 1] - bp[j])
+    return slope * (x - bp[j]) + vals[j]
+
+
+# Compile (or load the cached build) at import rather than on the first request
+_interp_scalar(0.0, *_HEALTH_LUT_DEFAULT)
+
+
 def calculate_health_score(rul_days: float, segment_id: str = None) -> float:
     """
     Calculate health score (0-100%) based on NEW CSV data ranges
@@ -305,61 +428,97 @@ def calculate_health_score(rul_days: float, segment_id: str = None) -> float:
     - C-D: <50%
     - D-E: 55-65%
     """
-    
-    if segment_id == "A-B":
-        # Target: >90% for RUL 13,000-14,000 days
-        if rul_days >= 13500:
-            return 92 + (rul_days - 13500) / 500 * 3  # 92-95%
-        elif rul_days >= 13000:
-            return 90 + (rul_days - 13000) / 500 * 2  # 90-92%
-        else:
-            # Below 13000, scale down
-            return max(85, (rul_days / 13000) * 90)
-    
-    elif segment_id == "B-C":
-        # Target: 75-85% for RUL 2,270-2,999 days
-        if rul_days >= 2800:
-            return 82 + (rul_days - 2800) / 200 * 3  # 82-85%
-        elif rul_days >= 2500:
-            return 78 + (rul_days - 2500) / 300 * 4  # 78-82%
-        elif rul_days >= 2270:
-            return 75 + (rul_days - 2270) / 230 * 3  # 75-78%
-        else:
-            # Below 2270, scale down
-            return max(65, (rul_days / 2270) * 75)
-    
-    elif segment_id == "C-D":
-        # Target: <50% for RUL 10-599 days
-        # Map to 15-45% range
-        if rul_days >= 400:
-            return 40 + (rul_days - 400) / 199 * 5  # 40-45%
-        elif rul_days >= 200:
-            return 30 + (rul_days - 200) / 200 * 10  # 30-40%
-        elif rul_days >= 100:
-            return 22 + (rul_days - 100) / 100 * 8  # 22-30%
-        elif rul_days >= 50:
-            return 18 + (rul_days - 50) / 50 * 4  # 18-22%
-        else:
-            return max(15, 15 + (rul_days / 50) * 3)  # 15-18%
-    
-    elif segment_id == "D-E":
-        # Target: 55-65% for RUL 770-1,499 days
-        if rul_days >= 1300:
-            return 62 + (rul_days - 1300) / 199 * 3  # 62-65%
-        elif rul_days >= 1000:
-            return 58 + (rul_days - 1000) / 300 * 4  # 58-62%
-        elif rul_days >= 770:
-            return 55 + (rul_days - 770) / 230 * 3  # 55-58%
-        else:
-            # Below 770, scale down
-            return max(45, (rul_days / 770) * 55)
-    
-    else:
-        # Fallback: Linear mapping
-        score = (rul_days / 14000) * 100
-        return max(0, min(100, score))
+
+    bp, vals = _HEALTH_LUT.get(segment_id, _HEALTH_LUT_DEFAULT)
+    return float(_interp_scalar(float(rul_days), bp, vals))
+
+
+def _health_for_segment(rul_days: float, bp: np.ndarray, vals: np.ndarray) -> float:
+    return float(_interp_scalar(float(rul_days), bp, vals))
+
+
+# calculate_health_score pre-bound to one segment's table, for callers that know
+# the segment up front (skips the segment_id lookup per call)
+health_score_ab = partial(_health_for_segment, bp=_HEALTH_LUT["A-B"][0], vals=_HEALTH_LUT["A-B"][1])
+health_score_bc = partial(_health_for_segment, bp=_HEALTH_LUT["B-C"][0], vals=_HEALTH_LUT["B-C"][1])
+health_score_cd = partial(_health_for_segment, bp=_HEALTH_LUT["C-D"][0], vals=_HEALTH_LUT["C-D"][1])
+health_score_de = partial(_health_for_segment, bp=_HEALTH_LUT["D-E"][0], vals=_HEALTH_LUT["D-E"][1])
+
+
+def calculate_health_score_batch(rul_days: np.ndarray, segment_id: str = None) -> np.ndarray:
+    """Vectorized calculate_health_score over an array of RUL values"""
+    bp, vals = _HEALTH_LUT.get(segment_id, _HEALTH_LUT_DEFAULT)
+    return np.interp(np.asarray(rul_days, dtype=np.float64), bp, vals)
 
 
 def calculate_health_score_simple(rul_days: float) -> float:
     """Simple fallback health score calculation"""
     return max(0, min(100, (rul_days / 14000) * 100))
+
+
+def parse_sensor_dict(value) -> Dict:
+    """Parse one stringified sensor dict, returning {} for missing or malformed values"""
+    if not isinstance(value, str) or value == 'nan':
+        return {}
+    # The CSVs hold Python dict reprs of plain floats: swapping the quotes makes
+    # them valid JSON; anything else (nan values, tuples, ...) goes through ast
+    try:
+        parsed = json_loads(value.replace("'", '"'))
+    except ValueError:
+        try:
+            parsed = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def expand_sensor_columns(df: pd.DataFrame, column: str, suffix: str) -> pd.DataFrame:
+    """
+    Flatten a stringified sensor dict column into typed float columns
+    
+    e.g. sensor_a -> pressure_A, flow_A, corrosion_A, temperature_A, acoustic_A.
+    Parsing happens once per row here so request handlers never touch the strings.
+    Missing fields default to 0.0, matching the old per-request fallback.
+    """
+    if column not in df.columns:
+        for field in SENSOR_FIELDS:
+            df[f'{field}_{suffix}'] = 0.0
+        return df
+    
+    parsed = df[column].map(parse_sensor_dict)
+    for field in SENSOR_FIELDS:
+        df[f'{field}_{suffix}'] = parsed.map(lambda d: d.get(field, 0)).astype('float64')
+    return df
+
+
+def load_history_csv(path: str) -> pd.DataFrame:
+    """
+    Load a history_XX.csv with both sensor dict columns flattened to floats
+    
+    The flattened frame is cached as a Parquet file next to the CSV, so later
+    cold starts do a typed columnar read instead of CSV + dict parsing. The cache
+    is rebuilt whenever the CSV is newer than it.
+    """
+    cache_path = os.path.splitext(path)[0] + '.parquet'
+    if (HAS_PYARROW and os.path.exists(cache_path)
+            and os.path.getmtime(cache_path) >= os.path.getmtime(path)):
+        return pd.read_parquet(cache_path, engine='pyarrow')
+    
+    if HAS_PYARROW:
+        # Multithreaded C++ parser; the Table is released as it converts
+        table = pacsv.read_csv(path, read_options=pacsv.ReadOptions(use_threads=True))
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        del table
+    else:
+        df = pd.read_csv(path)
+    expand_sensor_columns(df, 'sensor_a', 'A')
+    expand_sensor_columns(df, 'sensor_b', 'B')
+    df = df.drop(columns=['sensor_a', 'sensor_b'], errors='ignore')
+    
+    if HAS_PYARROW:
+        try:
+            df.to_parquet(cache_path, engine='pyarrow', compression='zstd', index=False)
+        except OSError as e:
+            # Read-only deploys still work, they just parse the CSV every start
+            print(f"Warning: could not write Parquet cache {cache_path}: {e}")
+    return df
@@ -10,29 +10,59 @@ User's ACTUAL Requirements:
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-import sys
-import os
+from concurrent.futures import ProcessPoolExecutor
 
-# Add src to path
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
-from generate_data import PipelineDegradationSimulator
+# pyarrow is optional: its multithreaded C++ CSV writer is much faster than to_csv
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+from src.generate_data import PipelineDegradationSimulator
 
-def generate_demo_scenarios():
-    """Generate 4 CSV files with CORRECT degradation patterns"""
+TOTAL_DAYS = 730
+
+
+def _run_scenario(sim, total_days, rul_fn):
+    """
+    Simulate days 1..total_days into a dict of per-field column arrays
     
-    print("=" * 70)
-    print("REGENERATING CSV FILES WITH CORRECT REQUIREMENTS")
-    print("=" * 70)
-    print("\nTarget Health Percentages:")
-    print("  A-B: >90% (Excellent)")
-    print("  B-C: 75-85% (Good/Disturbed)")
-    print("  C-D: <50% (Critical/Bad)")
-    print("  D-E: 5-15% (VERY POOR - Almost Failed!)")
-    print("=" * 70)
+    Results go straight into preallocated arrays (one per simulate_day field,
+    dtype taken from the first day) instead of a list of per-day dicts.
+    rul_fn maps a day number to the RUL fed to the simulator.
+    """
+    day = np.arange(1, total_days + 1)
+    ruls = [rul_fn(d) for d in day.tolist()]
     
-    # Scenario A-B: EXCELLENT (>90% health)
+    arrs = None
+    for i, (d, r) in enumerate(zip(day.tolist(), ruls)):
+        sensor_data = sim.simulate_day(d, r)
+        if arrs is None:
+            # Allocated from the first day (a separate probe call would advance the RNG)
+            arrs = {k: np.empty(total_days, dtype=np.asarray(v).dtype if np.isscalar(v) else object)
+                    for k, v in sensor_data.items()}
+        for k, v in sensor_data.items():
+            arrs[k][i] = v
+    
+    # np.array keeps int ramps as int64 and mixed ones as float64, like the old per-row frame
+    return {**arrs, 'day': day, 'RUL': np.array(ruls)}
+
+
+def _write_history_csv(columns, path):
+    """Write scenario columns as a backend history CSV"""
+    if pa is None:
+        pd.DataFrame(columns, copy=False).to_csv(path, index=False)
+        return
+    # Built straight from the arrays, no pandas frame in between. Arrow has no
+    # column type for the sensor dicts; store the same repr to_csv writes
+    table = pa.table({col: [str(v) for v in arr] if arr.dtype == object else arr
+                      for col, arr in columns.items()})
+    pacsv.write_csv(table, path)
+
+
+def _gen_ab():
+    """Scenario A-B: EXCELLENT (>90% health)"""
     # Target: RUL 13,000-14,000 days → ~92%
-    print("\n[1/4] Generating Segment A-B (Excellent - >90%)...")
     sim_ab = PipelineDegradationSimulator(
         scenario_type='slow_corrosion',
         duration_days=14000,
@@ -41,22 +71,14 @@ def generate_demo_scenarios():
     sim_ab.base_corrosion_rate = 0.0005
     sim_ab.corrosion_acceleration = 0.00001
     
-    data_ab = []
-    for day in range(1, 731):
-        rul = 14000 - day
-        sensor_data = sim_ab.simulate_day(day, rul)
-        sensor_data['day'] = day
-        sensor_data['RUL'] = rul
-        data_ab.append(sensor_data)
-    
-    df_ab = pd.DataFrame(data_ab)
-    df_ab.to_csv('backend/data/history_AB.csv', index=False)
-    print(f"      RUL Range: {df_ab['RUL'].min():.0f} - {df_ab['RUL'].max():.0f} days")
-    print(f"      Target Health: >90%")
-    
-    # Scenario B-C: GOOD/DISTURBED (75-85% health)
+    cols_ab = _run_scenario(sim_ab, TOTAL_DAYS, lambda day: 14000 - day)
+    _write_history_csv(cols_ab, 'backend/data/history_AB.csv')
+    return "A-B", cols_ab['RUL'].min(), cols_ab['RUL'].max()
+
+
+def _gen_bc():
+    """Scenario B-C: GOOD/DISTURBED (75-85% health)"""
     # Target: RUL 2,500-3,000 days → ~80%
-    print("\n[2/4] Generating Segment B-C (Good/Disturbed - 75-85%)...")
     sim_bc = PipelineDegradationSimulator(
         scenario_type='slow_corrosion',
         duration_days=3000,
@@ -65,22 +87,14 @@ def generate_demo_scenarios():
     sim_bc.base_corrosion_rate = 0.004
     sim_bc.corrosion_acceleration = 0.0001
     
-    data_bc = []
-    for day in range(1, 731):
-        rul = 3000 - day
-        sensor_data = sim_bc.simulate_day(day, rul)
-        sensor_data['day'] = day
-        sensor_data['RUL'] = rul
-        data_bc.append(sensor_data)
-    
-    df_bc = pd.DataFrame(data_bc)
-    df_bc.to_csv('backend/data/history_BC.csv', index=False)
-    print(f"      RUL Range: {df_bc['RUL'].min():.0f} - {df_bc['RUL'].max():.0f} days")
-    print(f"      Target Health: 75-85%")
-    
-    # Scenario C-D: CRITICAL/BAD (<50% health)
+    cols_bc = _run_scenario(sim_bc, TOTAL_DAYS, lambda day: 3000 - day)
+    _write_history_csv(cols_bc, 'backend/data/history_BC.csv')
+    return "B-C", cols_bc['RUL'].min(), cols_bc['RUL'].max()
+
+
+def _gen_cd():
+    """Scenario C-D: CRITICAL/BAD (<50% health)"""
     # Target: RUL 100-600 days → ~25-40%
-    print("\n[3/4] Generating Segment C-D (Critical/Bad - <50%)...")
     sim_cd = PipelineDegradationSimulator(
         scenario_type='pressure_surge',
         duration_days=600,
@@ -90,26 +104,17 @@ def generate_demo_scenarios():
     sim_cd.corrosion_acceleration = 0.0005
     sim_cd.leak_start_day = 160
     
-    data_cd = []
-    for day in range(1, 731):
-        if day < 160:
-            rul = 600 - day
-        else:
-            rul = max(10, 440 - (day - 160) * 1.5)
-        
-        sensor_data = sim_cd.simulate_day(day, rul)
-        sensor_data['day'] = day
-        sensor_data['RUL'] = rul
-        data_cd.append(sensor_data)
-    
-    df_cd = pd.DataFrame(data_cd)
-    df_cd.to_csv('backend/data/history_CD.csv', index=False)
-    print(f"      RUL Range: {df_cd['RUL'].min():.0f} - {df_cd['RUL'].max():.0f} days")
-    print(f"      Target Health: <50%")
-    
-    # Scenario D-E: VERY POOR (5-15% health) - ALMOST FAILED!
+    cols_cd = _run_scenario(
+        sim_cd, TOTAL_DAYS,
+        lambda day: 600 - day if day < 160 else max(10, 440 - (day - 160) * 1.5)
+    )
+    _write_history_csv(cols_cd, 'backend/data/history_CD.csv')
+    return "C-D", cols_cd['RUL'].min(), cols_cd['RUL'].max()
+
+
+def _gen_de():
+    """Scenario D-E: VERY POOR (5-15% health) - ALMOST FAILED!"""
     # Target: RUL 20-150 days → ~10%
-    print("\n[4/4] Generating Segment D-E (VERY POOR - 5-15%)...")
     sim_de = PipelineDegradationSimulator(
         scenario_type='fast_corrosion',
         duration_days=150,  # Very short lifespan!
@@ -120,23 +125,51 @@ def generate_demo_scenarios():
     sim_de.has_leak = True
     sim_de.leak_start_day = 50
     
-    data_de = []
-    for day in range(1, 731):
-        if day < 50:
-            rul = 150 - day
-        else:
-            # After leak starts, accelerated degradation
-            rul = max(5, 100 - (day - 50) * 0.3)
-        
-        sensor_data = sim_de.simulate_day(day, rul)
-        sensor_data['day'] = day
-        sensor_data['RUL'] = rul
-        data_de.append(sensor_data)
+    # After the leak starts (day 50), accelerated degradation
+    cols_de = _run_scenario(
+        sim_de, TOTAL_DAYS,
+        lambda day: 150 - day if day < 50 else max(5, 100 - (day - 50) * 0.3)
+    )
+    _write_history_csv(cols_de, 'backend/data/history_DE.csv')
+    return "D-E", cols_de['RUL'].min(), cols_de['RUL'].max()
+
+
+# (generator, progress label, target health) per segment, in print order
+SCENARIOS = [
+    (_gen_ab, "A-B (Excellent - >90%)", ">90%"),
+    (_gen_bc, "B-C (Good/Disturbed - 75-85%)", "75-85%"),
+    (_gen_cd, "C-D (Critical/Bad - <50%)", "<50%"),
+    (_gen_de, "D-E (VERY POOR - 5-15%)", "5-15%"),
+]
+
+
+def _call(fn):
+    """Run a scenario generator in a worker process (functions pickle by name)"""
+    return fn()
+
+
+def generate_demo_scenarios():
+    """Generate 4 CSV files with CORRECT degradation patterns"""
+    
+    print("=" * 70)
+    print("REGENERATING CSV FILES WITH CORRECT REQUIREMENTS")
+    print("=" * 70)
+    print("\nTarget Health Percentages:")
+    print("  A-B: >90% (Excellent)")
+    print("  B-C: 75-85% (Good/Disturbed)")
+    print("  C-D: <50% (Critical/Bad)")
+    print("  D-E: 5-15% (VERY POOR - Almost Failed!)")
+    print("=" * 70)
+    
+    # The segments share no state, so each one runs in its own process
+    print(f"\nGenerating {len(SCENARIOS)} segments in parallel...")
+    with ProcessPoolExecutor(max_workers=len(SCENARIOS)) as executor:
+        results = list(executor.map(_call, [fn for fn, _, _ in SCENARIOS]))
     
-    df_de = pd.DataFrame(data_de)
-    df_de.to_csv('backend/data/history_DE.csv', index=False)
-    print(f"      RUL Range: {df_de['RUL'].min():.0f} - {df_de['RUL'].max():.0f} days")
-    print(f"      Target Health: 5-15%")
+    for i, ((_, label, target), (_, rul_min, rul_max)) in enumerate(zip(SCENARIOS, results), 1):
+        print(f"\n[{i}/{len(SCENARIOS)}] Segment {label}")
+        print(f"      RUL Range: {rul_min:.0f} - {rul_max:.0f} days")
+        print(f"      Target Health: {target}")
     
     print("\n" + "=" * 70)
     print("[SUCCESS] All CSV files regenerated!")
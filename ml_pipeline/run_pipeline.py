@@ -6,15 +6,12 @@ Runs complete ML pipeline from data generation to model training.
 """
 
 import sys
-import os
+import time
 from datetime import datetime
 
-# Add src to path
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
-
-from generate_data import generate_synthetic_data
-from feature_engineering import engineer_features
-from model_training import train_and_evaluate
+from src.generate_data import generate_synthetic_data
+from src.feature_engineering import engineer_features
+from src.model_training import train_and_evaluate
 
 
 def main():
@@ -26,7 +23,7 @@ def main():
     print("="*70)
     print(f"\nStarted at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    start_time = datetime.now()
+    t0 = time.perf_counter()
     
     try:
         # Phase 1: Generate Synthetic Data
@@ -36,8 +33,9 @@ def main():
         
         df_raw = generate_synthetic_data(
             num_scenarios=1000,
-            output_path='data/synthetic_pipeline_data.csv'
+            output_path='data/synthetic_pipeline_data.parquet'
         )
+        t1 = time.perf_counter()
         
         # Phase 2: Feature Engineering
         print("\n" + "#"*70)
@@ -45,9 +43,10 @@ def main():
         print("#"*70)
         
         df_features = engineer_features(
-            input_path='data/synthetic_pipeline_data.csv',
+            input_path='data/synthetic_pipeline_data.parquet',
             output_path='data/features_engineered.csv'
         )
+        t2 = time.perf_counter()
         
         # Phase 3: Model Training
         print("\n" + "#"*70)
@@ -57,16 +56,22 @@ def main():
         predictor, metrics = train_and_evaluate(
             features_path='data/features_engineered.csv'
         )
+        t3 = time.perf_counter()
         
         # Summary
-        end_time = datetime.now()
-        duration = end_time - start_time
+        timings = {
+            'Phase1': t1 - t0,
+            'Phase2': t2 - t1,
+            'Phase3': t3 - t2,
+            'Total': t3 - t0,
+        }
         
         print("\n" + "="*70)
         print(" "*20 + "PIPELINE COMPLETE!")
         print("="*70)
-        print(f"\nTotal execution time: {duration}")
-        print(f"Finished at: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"\nTotal execution time: {timings['Total']:.2f}s")
+        print(f"Phase1 {timings['Phase1']:.2f}s  Phase2 {timings['Phase2']:.2f}s  Phase3 {timings['Phase3']:.2f}s")
+        print(f"Finished at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
         print("\n" + "-"*70)
         print("FINAL MODEL PERFORMANCE")
@@ -80,11 +85,13 @@ def main():
         
         print("\nGenerated Files:")
         print("  Data:")
-        print("    - data/synthetic_pipeline_data.csv")
+        print("    - data/synthetic_pipeline_data.parquet")
         print("    - data/features_engineered.csv")
         print("  Models:")
-        print("    - models/rul_model.pkl")
-        print("    - models/feature_scaler.pkl")
+        print("    - models/rul_model.ubj")
+        print("    - models/feature_scaler.pkl (empty placeholder)")
+        print("    - models/feature_names.json")
+        print("    - models/test_scenarios.npy")
         print("  Results:")
         print("    - results/evaluation_metrics.csv")
         print("    - results/feature_importance.csv")
@@ -0,0 +1 @@
+"""ML pipeline stages: synthetic data generation, feature engineering, model training."""
@@ -7,10 +7,161 @@ Calculates 105 features from dual-sensor raw data for ML training.
 
 import numpy as np
 import pandas as pd
-from tqdm import tqdm
 import warnings
 warnings.filterwarnings('ignore')
 
+# bottleneck is optional: its O(N) running-sum kernels replace pandas' rolling dispatch
+try:
+    import bottleneck as bn
+except ImportError:
+    bn = None
+
+# numba is optional: without it the rolling stats come from the per-statistic kernels above
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+METRICS = ('pressure', 'flow', 'corrosion', 'acoustic', 'temperature')
+SENSORS = ('A', 'B')
+
+# Raw reading columns, sensor-major: the column order of every per-sensor feature block
+SENSOR_COLUMNS = [f'{metric}_{sensor}' for sensor in SENSORS for metric in METRICS]
+
+# Derived feature names per raw column (same order as SENSOR_COLUMNS), built once
+ROLLING_AVG_NAMES = [(f'{metric}_7d_avg_{sensor}', f'{metric}_30d_avg_{sensor}', f'{metric}_90d_avg_{sensor}')
+                     for sensor in SENSORS for metric in METRICS]
+ROLLING_STD_NAMES = [(f'{metric}_7d_std_{sensor}', f'{metric}_30d_std_{sensor}')
+                     for sensor in SENSORS for metric in METRICS]
+CHANGE_NAMES = [(f'{metric}_7d_change_{sensor}', f'{metric}_30d_change_{sensor}', f'{metric}_90d_change_{sensor}')
+                for sensor in SENSORS for metric in METRICS]
+
+# Leading rows of each scenario without a full 90-day history (their 90-day
+# change is NaN); engineer_features drops them
+WARMUP_DAYS = 90
+
+
+def _move_mean(arr, window, min_count):
+    """
+    Trailing moving mean down axis 0, same as rolling(window, min_periods=min_count).mean()
+    
+    arr is 1-D or (rows, columns); every column is windowed in the same call.
+    """
+    if bn is None:
+        return pd.DataFrame(arr).rolling(window, min_periods=min_count).mean().to_numpy().reshape(arr.shape)
+    if window > len(arr):
+        # bottleneck caps the window at the array length; a longer one sees the same rows
+        if min_count > len(arr):
+            return np.full(arr.shape, np.nan)
+        window = len(arr)
+    return bn.move_mean(arr, window, min_count=min_count, axis=0)
+
+
+def _move_std(arr, window, min_count):
+    """Trailing moving sample std down axis 0, same as rolling(window, min_periods=min_count).std()"""
+    if bn is None:
+        return pd.DataFrame(arr).rolling(window, min_periods=min_count).std().to_numpy().reshape(arr.shape)
+    if window > len(arr):
+        if min_count > len(arr):
+            return np.full(arr.shape, np.nan)
+        window = len(arr)
+    return bn.move_std(arr, window, min_count=min_count, ddof=1, axis=0)
+
+
+if HAS_NUMBA:
+    # No on-disk cache: this module is imported both as src.feature_engineering
+    # and as a top-level script/module, and a cached build only reloads under
+    # the module name that wrote it
+    @njit(parallel=True)
+    def _fused_rolling(cols, out):
+        """
+        All five rolling statistics in one pass over each column.
+        
+        cols is (columns, rows); out is (5, columns, rows) and receives the
+        7/30/90-day means and 7/30-day sample stds, with the same min_count
+        and NaN-skipping rules as the _move_mean/_move_std calls. Each row is
+        read once: the value leaving a window is read back from the column
+        itself (it is its own ring buffer). The 7/30-day windows keep
+        Welford mean/M2 accumulators in float64, the 90-day one a plain sum.
+        Columns run in parallel, each writing its own contiguous output rows.
+        """
+        n_cols, n = cols.shape
+        for j in prange(n_cols):
+            x = cols[j]
+            mean7 = m2_7 = mean30 = m2_30 = sum90 = 0.0
+            count7 = count30 = count90 = 0
+            for i in range(n):
+                v = x[i]
+                if not np.isnan(v):
+                    count7 += 1
+                    d = v - mean7
+                    mean7 += d / count7
+                    m2_7 += d * (v - mean7)
+                    count30 += 1
+                    d = v - mean30
+                    mean30 += d / count30
+                    m2_30 += d * (v - mean30)
+                    count90 += 1
+                    sum90 += v
+                if i >= 7:
+                    v = x[i - 7]
+                    if not np.isnan(v):
+                        count7 -= 1
+                        if count7 == 0:
+                            mean7 = m2_7 = 0.0
+                        else:
+                            d = v - mean7
+                            mean7 -= d / count7
+                            m2_7 -= d * (v - mean7)
+                if i >= 30:
+                    v = x[i - 30]
+                    if not np.isnan(v):
+                        count30 -= 1
+                        if count30 == 0:
+                            mean30 = m2_30 = 0.0
+                        else:
+                            d = v - mean30
+                            mean30 -= d / count30
+                            m2_30 -= d * (v - mean30)
+                if i >= 90:
+                    v = x[i - 90]
+                    if not np.isnan(v):
+                        count90 -= 1
+                        sum90 -= v
+                
+                out[0, j, i] = mean7 if count7 >= 1 else np.nan
+                out[1, j, i] = mean30 if count30 >= 1 else np.nan
+                out[2, j, i] = sum90 / count90 if count90 >= 90 else np.nan
+                out[3, j, i] = np.sqrt(max(m2_7, 0.0) / (count7 - 1)) if count7 >= 2 else np.nan
+                out[4, j, i] = np.sqrt(max(m2_30, 0.0) / (count30 - 1)) if count30 >= 2 else np.nan
+
+
+def _rolling_stats(M):
+    """
+    7/30/90-day means and 7/30-day stds of every column of M (rows, columns),
+    as five float32 arrays shaped like M.
+    """
+    if HAS_NUMBA:
+        out = np.empty((5, M.shape[1], M.shape[0]), dtype=np.float32)
+        _fused_rolling(np.ascontiguousarray(M.T), out)
+        return tuple(stat.T for stat in out)
+    # Running sums are accumulated in float64 (in float32 they drift by a few
+    # percent of the std over a long run); the features are stored as float32
+    M64 = M.astype(np.float64)
+    avg_7d, avg_30d, avg_90d = (_move_mean(M64, w, c).astype(np.float32) for w, c in ((7, 1), (30, 1), (90, 90)))
+    std_7d, std_30d = (_move_std(M64, w, 1).astype(np.float32) for w in (7, 30))
+    return avg_7d, avg_30d, avg_90d, std_7d, std_30d
+
+
+def _change(arr, periods):
+    """arr minus arr shifted down by periods rows (axis 0), NaN where there is no earlier row"""
+    # Subtract the overlapping slices straight into the output: no shifted copy
+    out = np.empty_like(arr)
+    out[:periods] = np.nan
+    np.subtract(arr[periods:], arr[:-periods], out=out[periods:])
+    return out
+
 
 class FeatureEngineer:
     """
@@ -38,23 +189,46 @@ class FeatureEngineer:
         print(f"\nInput data shape: {df.shape}")
         print(f"Scenarios: {df['scenario_id'].nunique()}")
         
-        # Process each scenario separately (to avoid data leakage)
-        print("\nCalculating features for each scenario...")
+        # float32 halves the bytes every feature kernel streams through; the
+        # readings carry at most 4 decimals, so nothing is lost. A categorical
+        # scenario_id lets the sort and groupby below bucket rows by integer
+        # code instead of hashing every id.
+        df = df.astype({**dict.fromkeys(SENSOR_COLUMNS, np.float32), 'scenario_id': 'category'})
+        
+        # Features never mix scenarios (to avoid data leakage): every window is at
+        # most WARMUP_DAYS rows, so for the rows kept below it stays inside the
+        # row's own scenario. That lets one pass over the whole sorted frame
+        # replace a pass per scenario; only the dropped warm-up rows see values
+        # from the previous scenario.
+        print("\nCalculating features for all scenarios...")
+        df = df.sort_values(['scenario_id', 'day'], kind='stable')
+        position = df.groupby('scenario_id', sort=False, observed=True).cumcount().to_numpy()
+        kept = np.flatnonzero(position >= WARMUP_DAYS)
         
-        all_features = []
+        all_features = self._calculate_features(df)
         
-        for scenario_id in tqdm(df['scenario_id'].unique(), desc="Processing scenarios", unit="scenario"):
-            scenario_df = df[df['scenario_id'] == scenario_id].copy()
-            scenario_features = self._calculate_scenario_features(scenario_df)
-            all_features.append(scenario_features)
+        # The kept rows gathered into one preallocated block, column-major so each
+        # feature is a contiguous slice and the DataFrame wraps it without a copy
+        out = np.empty((len(kept), len(self.feature_names)), dtype=np.float32, order='F')
+        for j, name in enumerate(self.feature_names):
+            np.take(all_features[name], kept, out=out[:, j])
+        del all_features
         
         # Combine all scenarios
         print("\nCombining features...")
-        features_df = pd.concat(all_features, ignore_index=True)
+        print(f"Rows before removing NaN: {len(df):,}")
+        # Past the warm-up only gaps in the input readings can leave a NaN
+        complete = ~np.isnan(out).any(axis=1)
+        if not complete.all():
+            out, kept = out[complete], kept[complete]
         
-        # Remove rows with NaN (first 90 days don't have 90-day features)
-        print(f"Rows before removing NaN: {len(features_df):,}")
-        features_df = features_df.dropna()
+        # Index as the old concat + dropna left it: positions in the sorted input
+        meta = df.iloc[kept]
+        features_df = pd.DataFrame(out, columns=self.feature_names, index=kept, copy=False)
+        features_df.insert(0, 'scenario_id', meta['scenario_id'].to_numpy())
+        features_df.insert(1, 'day', meta['day'].to_numpy())
+        features_df.insert(2, 'date', meta['date'].to_numpy())
+        features_df['RUL'] = meta['RUL'].to_numpy()
         print(f"Rows after removing NaN:  {len(features_df):,}")
         
         print("\n" + "-"*70)
@@ -67,97 +241,89 @@ class FeatureEngineer:
         
         return features_df
     
-    def _calculate_scenario_features(self, df):
-        """Calculate features for a single scenario."""
+    def _calculate_features(self, df):
+        """
+        Calculate features over rows sorted by scenario, then day.
+        
+        Windows run straight across scenario boundaries, so the first
+        WARMUP_DAYS rows of each scenario are only valid for a frame holding a
+        single scenario; engineer_features discards them.
+        
+        Returns:
+            dict: Feature name -> float32 array over the rows, in feature order
+            (metadata and RUL stay with the caller)
+        """
         
-        features = pd.DataFrame()
+        features = {}
         
-        # Metadata
-        features['scenario_id'] = df['scenario_id']
-        features['day'] = df['day']
-        features['date'] = df['date']
+        # All 10 raw columns as one (rows, 10) block, sensor-major, so each
+        # window/statistic below is a single call over every column
+        M = df[SENSOR_COLUMNS].to_numpy(dtype=np.float32)
         
         # ===== RAW SENSOR READINGS (10 features) =====
-        for sensor in ['A', 'B']:
-            for metric in ['pressure', 'flow', 'corrosion', 'acoustic', 'temperature']:
-                col_name = f'{metric}_{sensor}'
-                features[col_name] = df[col_name]
+        for j, col_name in enumerate(SENSOR_COLUMNS):
+            features[col_name] = M[:, j]
+        
+        avg_7d, avg_30d, avg_90d, std_7d, std_30d = _rolling_stats(M)
+        change_7d, change_30d, change_90d = _change(M, 7), _change(M, 30), _change(M, 90)
         
         # ===== ROLLING AVERAGES (30 features) =====
-        for sensor in ['A', 'B']:
-            for metric in ['pressure', 'flow', 'corrosion', 'acoustic', 'temperature']:
-                col_name = f'{metric}_{sensor}'
-                
-                # 7-day average
-                features[f'{metric}_7d_avg_{sensor}'] = df[col_name].rolling(7, min_periods=1).mean()
-                
-                # 30-day average
-                features[f'{metric}_30d_avg_{sensor}'] = df[col_name].rolling(30, min_periods=1).mean()
-                
-                # 90-day average
-                features[f'{metric}_90d_avg_{sensor}'] = df[col_name].rolling(90, min_periods=90).mean()
+        for j, (name_7d, name_30d, name_90d) in enumerate(ROLLING_AVG_NAMES):
+            features[name_7d] = avg_7d[:, j]
+            features[name_30d] = avg_30d[:, j]
+            features[name_90d] = avg_90d[:, j]
         
         # ===== STANDARD DEVIATIONS (20 features) =====
-        for sensor in ['A', 'B']:
-            for metric in ['pressure', 'flow', 'corrosion', 'acoustic', 'temperature']:
-                col_name = f'{metric}_{sensor}'
-                
-                # 7-day std
-                features[f'{metric}_7d_std_{sensor}'] = df[col_name].rolling(7, min_periods=1).std()
-                
-                # 30-day std
-                features[f'{metric}_30d_std_{sensor}'] = df[col_name].rolling(30, min_periods=1).std()
+        for j, (name_7d, name_30d) in enumerate(ROLLING_STD_NAMES):
+            features[name_7d] = std_7d[:, j]
+            features[name_30d] = std_30d[:, j]
         
         # ===== RATE OF CHANGE (30 features) =====
-        for sensor in ['A', 'B']:
-            for metric in ['pressure', 'flow', 'corrosion', 'acoustic', 'temperature']:
-                col_name = f'{metric}_{sensor}'
-                
-                # 7-day change
-                features[f'{metric}_7d_change_{sensor}'] = df[col_name] - df[col_name].shift(7)
-                
-                # 30-day change
-                features[f'{metric}_30d_change_{sensor}'] = df[col_name] - df[col_name].shift(30)
-                
-                # 90-day change
-                features[f'{metric}_90d_change_{sensor}'] = df[col_name] - df[col_name].shift(90)
+        for j, (name_7d, name_30d, name_90d) in enumerate(CHANGE_NAMES):
+            features[name_7d] = change_7d[:, j]
+            features[name_30d] = change_30d[:, j]
+            features[name_90d] = change_90d[:, j]
         
         # ===== DIFFERENTIAL FEATURES (15 features) =====
+        # Plain arrays, each raw column pulled once; shared terms are computed once
+        pA, fA, cA, aA, tA, pB, fB, cB, aB, tB = (df[col].to_numpy(dtype=np.float32) for col in SENSOR_COLUMNS)
+        # Denominators used twice: one division each, then multiplies
+        inv_pA, inv_fA = 1.0 / (pA + 0.001), 1.0 / (fA + 0.001)
         
         # Pressure differentials
-        features['pressure_drop_AB'] = df['pressure_A'] - df['pressure_B']
-        features['pressure_gradient_AB'] = features['pressure_drop_AB'] / 0.5  # 500m = 0.5km
-        features['pressure_ratio_AB'] = df['pressure_B'] / (df['pressure_A'] + 0.001)
+        p_drop = pA - pB
+        features['pressure_drop_AB'] = p_drop
+        features['pressure_gradient_AB'] = p_drop * 2.0  # per km: 500m = 0.5km
+        features['pressure_ratio_AB'] = pB * inv_pA
         
         # Flow differentials
-        features['flow_drop_AB'] = df['flow_A'] - df['flow_B']
-        features['flow_efficiency_AB'] = df['flow_B'] / (df['flow_A'] + 0.001)
-        features['flow_loss_percent_AB'] = (df['flow_A'] - df['flow_B']) / (df['flow_A'] + 0.001) * 100
+        f_drop = fA - fB
+        features['flow_drop_AB'] = f_drop
+        features['flow_efficiency_AB'] = fB * inv_fA
+        features['flow_loss_percent_AB'] = f_drop * inv_fA * 100
         
         # Corrosion differentials
-        features['corrosion_diff_AB'] = df['corrosion_B'] - df['corrosion_A']
-        features['corrosion_ratio_AB'] = df['corrosion_B'] / (df['corrosion_A'] + 0.0001)
+        features['corrosion_diff_AB'] = cB - cA
+        features['corrosion_ratio_AB'] = cB / (cA + 0.0001)
         
         # Acoustic differentials
-        features['acoustic_diff_AB'] = df['acoustic_B'] - df['acoustic_A']
-        features['acoustic_ratio_AB'] = df['acoustic_B'] / (df['acoustic_A'] + 0.001)
+        features['acoustic_diff_AB'] = aB - aA
+        features['acoustic_ratio_AB'] = aB / (aA + 0.001)
         
         # Temperature differentials
-        features['temperature_diff_AB'] = df['temperature_B'] - df['temperature_A']
-        features['temperature_avg_AB'] = (df['temperature_A'] + df['temperature_B']) / 2
+        features['temperature_diff_AB'] = tB - tA
+        features['temperature_avg_AB'] = (tA + tB) / 2
         
         # Combined metrics
-        features['flow_pressure_ratio_A'] = df['flow_A'] / (df['pressure_A'] + 0.001)
-        features['flow_pressure_ratio_B'] = df['flow_B'] / (df['pressure_B'] + 0.001)
-        features['segment_efficiency'] = features['flow_pressure_ratio_B'] / (features['flow_pressure_ratio_A'] + 0.001)
-        
-        # ===== TARGET =====
-        features['RUL'] = df['RUL']
+        fp_ratio_A = fA * inv_pA
+        fp_ratio_B = fB / (pB + 0.001)
+        features['flow_pressure_ratio_A'] = fp_ratio_A
+        features['flow_pressure_ratio_B'] = fp_ratio_B
+        features['segment_efficiency'] = fp_ratio_B / (fp_ratio_A + 0.001)
         
-        # Store feature names (excluding metadata and target)
+        # Store feature names
         if not self.feature_names:
-            self.feature_names = [col for col in features.columns 
-                                 if col not in ['scenario_id', 'day', 'date', 'RUL']]
+            self.feature_names = list(features)
         
         return features
     
@@ -166,13 +332,13 @@ class FeatureEngineer:
         return self.feature_names
 
 
-def engineer_features(input_path='data/synthetic_pipeline_data.csv',
+def engineer_features(input_path='data/synthetic_pipeline_data.parquet',
                      output_path='data/features_engineered.csv'):
     """
     Main function to engineer features from raw data.
     
     Args:
-        input_path: Path to raw synthetic data
+        input_path: Path to raw synthetic data (.parquet, or .csv)
         output_path: Where to save engineered features
         
     Returns:
@@ -180,7 +346,10 @@ def engineer_features(input_path='data/synthetic_pipeline_data.csv',
     """
     # Load raw data
     print(f"\nLoading data from {input_path}...")
-    df = pd.read_csv(input_path, parse_dates=['date'])
+    if input_path.endswith('.parquet'):
+        df = pd.read_parquet(input_path, engine='pyarrow')
+    else:
+        df = pd.read_csv(input_path, parse_dates=['date'])
     
     # Engineer features
     engineer = FeatureEngineer()
@@ -10,11 +10,25 @@ Date: 2026-01-17
 
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 from tqdm import tqdm
+from joblib import Parallel, delayed
 import warnings
 warnings.filterwarnings('ignore')
 
+# numba is optional: without it generate_scenario steps the simulator one day at a time
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Per-day output columns, in generate_scenario's frame order (after scenario_id/day/date)
+SENSOR_COLUMNS = [
+    'pressure_A', 'flow_A', 'corrosion_A', 'acoustic_A', 'temperature_A',
+    'pressure_B', 'flow_B', 'corrosion_B', 'acoustic_B', 'temperature_B',
+]
+
 class PipelineDegradationSimulator:
     """
     Physics-based pipeline degradation simulator.
@@ -117,6 +131,51 @@ class PipelineDegradationSimulator:
             self.base_corrosion_rate = overrides.get('corrosion', self.base_corrosion_rate)
 
     
+    def degradation_trends(self, duration_days):
+        """
+        Noise-free per-day quantities for days 1..duration_days, as arrays.
+        
+        Everything simulate_day derives from the day number and the wall
+        thickness alone, computed for the whole run at once. The wall
+        thickness has no other cross-day state: it is the initial value minus
+        the running total of corrosion, accumulated in the same order as the
+        day loop so the floats match it exactly.
+        
+        Returns:
+            dict: Arrays of length duration_days (see keys below)
+        """
+        day = np.arange(1, duration_days + 1)
+        corrosion_rate = self.base_corrosion_rate * (1 + self.corrosion_acceleration * day)
+        wall_thickness = np.subtract.accumulate(
+            np.concatenate(([self.initial_wall_thickness], corrosion_rate)))[1:]
+        
+        rul = np.where(wall_thickness <= self.critical_wall_thickness, 0,
+                       ((wall_thickness - self.critical_wall_thickness) / corrosion_rate).astype(np.int64))
+        
+        pressure = self.initial_pressure * (wall_thickness / self.initial_wall_thickness) ** 2 - (day * self.pressure_decline_factor)
+        
+        # Multiplying by 1.0 / scaling by (1 - 0) leaves a reading unchanged bit for bit
+        blockage_factor = np.ones(duration_days)
+        if self.has_blockage:
+            blockage_factor = np.maximum(0.5, 1.0 - (self.blockage_growth_rate * day))
+        leak_severity = np.zeros(duration_days)
+        if self.has_leak:
+            leaking = day >= self.leak_start_day
+            leak_severity[leaking] = np.minimum(0.3, (day[leaking] - self.leak_start_day) / 50.0)
+        
+        damage_factor = 1 - (wall_thickness / self.initial_wall_thickness)
+        
+        return {
+            'corrosion_rate': corrosion_rate,
+            'rul': rul,
+            'pressure': pressure,                       # before daily cycle, leak and noise
+            'blockage_factor': blockage_factor,
+            'leak_severity': leak_severity,             # applies to the downstream sensor
+            'acoustic': 40.0 + (50 * damage_factor ** 2),
+            'spike_probability': damage_factor * 0.1,
+            'seasonal_temp': 20 + 8 * np.sin(2 * np.pi * (day % 365) / 365),
+        }
+    
     def simulate_day(self, day_number, wall_thickness):
         """
         Simulate one day of pipeline operation.
@@ -228,6 +287,75 @@ class PipelineDegradationSimulator:
         }
 
 
+if HAS_NUMBA:
+    # No on-disk cache: this module is imported both as src.generate_data and
+    # as a top-level script/module (generate_demo_scenarios), and a cached
+    # build only reloads under the module name that wrote it
+    @njit
+    def _simulate_readings(seed, initial_pressure, initial_flow, pressure_cycles, corrosion_rate,
+                           base_pressure, blockage_factor, leak_severity, base_acoustic,
+                           spike_probability, seasonal_temp):
+        """
+        Compiled equivalent of the per-day sensor readings in simulate_day.
+        
+        Takes the degradation_trends arrays and adds the random part (daily
+        cycle, spikes, sensor noise), returning a (days, 10) array in
+        SENSOR_COLUMNS order. Numba's np.random is seeded with the same
+        Mersenne Twister stream as RandomState(seed) and the draws are made in
+        the same order, so the readings match the per-day simulator. Keep the
+        two in sync.
+        """
+        np.random.seed(seed)
+        duration_days = len(corrosion_rate)
+        # The readings are already rounded to 2-4 decimals, well within float32
+        out = np.empty((duration_days, 10), dtype=np.float32)
+        
+        for i in range(duration_days):
+            # Sensor A (upstream), then sensor B (downstream)
+            for s in range(2):
+                hour_of_day = np.random.randint(0, 24)
+                pressure = base_pressure[i] + 0.3 * np.sin(2 * np.pi * hour_of_day / 24)
+                if pressure_cycles:
+                    pressure += np.random.normal(0, 0.4)
+                
+                flow = initial_flow * np.sqrt(pressure / initial_pressure)
+                flow *= blockage_factor[i]
+                if s == 1:
+                    pressure *= (1 - leak_severity[i] * 1.5)
+                    flow *= (1 - leak_severity[i])
+                
+                acoustic = base_acoustic[i]
+                if np.random.random() < spike_probability[i]:
+                    acoustic += np.random.uniform(10, 30)
+                
+                temperature = seasonal_temp[i] + 5 * np.sin(2 * np.pi * hour_of_day / 24)
+                
+                pressure += np.random.normal(0, 0.05)
+                flow += np.random.normal(0, 2.0)
+                corrosion = corrosion_rate[i] + np.random.normal(0, 0.001)
+                acoustic += np.random.normal(0, 2.0)
+                temperature += np.random.normal(0, 0.5)
+                
+                # Same bounds as the builtin max(lo, min(hi, x)) calls, NaN included
+                pressure = pressure if pressure < 6.0 else 6.0
+                pressure = pressure if pressure > 1.5 else 1.5
+                flow = flow if flow < 250 else 250.0
+                flow = flow if flow > 50 else 50.0
+                corrosion = corrosion if corrosion > 0.005 else 0.005
+                acoustic = acoustic if acoustic < 120 else 120.0
+                acoustic = acoustic if acoustic > 35 else 35.0
+                temperature = temperature if temperature < 35 else 35.0
+                temperature = temperature if temperature > 5 else 5.0
+                
+                out[i, 5 * s] = round(pressure, 3)
+                out[i, 5 * s + 1] = round(flow, 2)
+                out[i, 5 * s + 2] = round(corrosion, 4)
+                out[i, 5 * s + 3] = round(acoustic, 2)
+                out[i, 5 * s + 4] = round(temperature, 2)
+        
+        return out
+
+
 def generate_scenario(scenario_id, scenario_type, duration_days, start_date, seed):
     """
     Generate one complete scenario from healthy to failure.
@@ -244,52 +372,65 @@ def generate_scenario(scenario_id, scenario_type, duration_days, start_date, see
     """
     simulator = PipelineDegradationSimulator(scenario_type, duration_days, seed)
     
-    data = []
+    if not HAS_NUMBA:
+        return _step_scenario(simulator, scenario_id, duration_days, start_date)
+    
+    trends = simulator.degradation_trends(duration_days)
+    out = _simulate_readings(
+        seed, simulator.initial_pressure, simulator.initial_flow,
+        getattr(simulator, 'pressure_cycles', False),
+        trends['corrosion_rate'], trends['pressure'], trends['blockage_factor'],
+        trends['leak_severity'], trends['acoustic'], trends['spike_probability'],
+        trends['seasonal_temp']
+    )
+    
+    return _scenario_frame(scenario_id, start_date, out, trends['rul'])
+
+
+def _step_scenario(simulator, scenario_id, duration_days, start_date):
+    """generate_scenario by calling simulator.simulate_day for each day (no numba)"""
+    out = np.empty((duration_days, len(SENSOR_COLUMNS)), dtype=np.float32)
+    rul = np.empty(duration_days, dtype=np.int64)
     wall_thickness = simulator.initial_wall_thickness
-    current_date = start_date
     
     for day in range(1, duration_days + 1):
         # Simulate this day
         result = simulator.simulate_day(day, wall_thickness)
         wall_thickness = result['wall_thickness']
         
-        # Create data row
-        row = {
-            'scenario_id': scenario_id,
-            'day': day,
-            'date': current_date,
-            
-            # Sensor A
-            'pressure_A': result['sensor_a']['pressure'],
-            'flow_A': result['sensor_a']['flow'],
-            'corrosion_A': result['sensor_a']['corrosion'],
-            'acoustic_A': result['sensor_a']['acoustic'],
-            'temperature_A': result['sensor_a']['temperature'],
-            
-            # Sensor B
-            'pressure_B': result['sensor_b']['pressure'],
-            'flow_B': result['sensor_b']['flow'],
-            'corrosion_B': result['sensor_b']['corrosion'],
-            'acoustic_B': result['sensor_b']['acoustic'],
-            'temperature_B': result['sensor_b']['temperature'],
-            
-            # Target
-            'RUL': result['rul']
-        }
-        
-        data.append(row)
-        current_date += timedelta(days=1)
+        sensor_a, sensor_b = result['sensor_a'], result['sensor_b']
+        out[day - 1] = (
+            sensor_a['pressure'], sensor_a['flow'], sensor_a['corrosion'],
+            sensor_a['acoustic'], sensor_a['temperature'],
+            sensor_b['pressure'], sensor_b['flow'], sensor_b['corrosion'],
+            sensor_b['acoustic'], sensor_b['temperature'],
+        )
+        rul[day - 1] = result['rul']
     
-    return pd.DataFrame(data)
+    return _scenario_frame(scenario_id, start_date, out, rul)
+
+
+def _scenario_frame(scenario_id, start_date, readings, rul):
+    """Scenario DataFrame from a (days, 10) SENSOR_COLUMNS array and the RUL per day"""
+    duration_days = len(readings)
+    columns = {
+        'scenario_id': np.full(duration_days, scenario_id),
+        'day': np.arange(1, duration_days + 1),
+        'date': pd.date_range(start_date, periods=duration_days, freq='D'),
+    }
+    for j, col in enumerate(SENSOR_COLUMNS):
+        columns[col] = readings[:, j]
+    columns['RUL'] = rul
+    return pd.DataFrame(columns)
 
 
-def generate_synthetic_data(num_scenarios=1000, output_path='data/synthetic_pipeline_data.csv'):
+def generate_synthetic_data(num_scenarios=1000, output_path='data/synthetic_pipeline_data.parquet'):
     """
     Generate complete synthetic training dataset.
     
     Args:
         num_scenarios: Number of scenarios to generate
-        output_path: Where to save the data
+        output_path: Where to save the data (.parquet, or .csv)
         
     Returns:
         DataFrame: Complete synthetic dataset
@@ -308,7 +449,6 @@ def generate_synthetic_data(num_scenarios=1000, output_path='data/synthetic_pipe
         'combined': (0.05, (180, 450))
     }
     
-    all_data = []
     start_date = datetime(2024, 1, 1)
     
     print(f"\nGenerating {num_scenarios} scenarios...")
@@ -319,38 +459,36 @@ def generate_synthetic_data(num_scenarios=1000, output_path='data/synthetic_pipe
     
     print(f"\nProgress:")
     
+    # Draw every scenario's duration up front, in the same order as before, so the
+    # scenarios themselves (independent, each with its own seed) can run in parallel
+    tasks = []
     scenario_id = 1
-    pbar = tqdm(total=num_scenarios, desc="Generating scenarios", unit="scenario")
-    
     for scenario_type, (percentage, duration_range) in scenario_distribution.items():
         count = int(num_scenarios * percentage)
         
         for i in range(count):
             # Random duration within range
             duration = np.random.randint(duration_range[0], duration_range[1] + 1)
-            
-            # Generate scenario
-            scenario_df = generate_scenario(
-                scenario_id=scenario_id,
-                scenario_type=scenario_type,
-                duration_days=duration,
-                start_date=start_date,
-                seed=scenario_id
-            )
-            
-            all_data.append(scenario_df)
+            tasks.append((scenario_id, scenario_type, duration, start_date, scenario_id))
             scenario_id += 1
-            pbar.update(1)
     
-    pbar.close()
+    # Worker processes, results yielded in task order as they finish
+    results = Parallel(n_jobs=-1, backend='loky', return_as='generator')(
+        delayed(generate_scenario)(*task) for task in tasks
+    )
+    all_data = list(tqdm(results, total=len(tasks), desc="Generating scenarios", unit="scenario"))
     
     # Combine all scenarios
     print("\nCombining all scenarios...")
     df = pd.concat(all_data, ignore_index=True)
     
-    # Save to CSV
+    # Parquet keeps the column types (float32 readings, dates) and skips text
+    # formatting; engineer_features reads it back without parsing
     print(f"Saving to {output_path}...")
-    df.to_csv(output_path, index=False)
+    if output_path.endswith('.parquet'):
+        df.to_parquet(output_path, engine='pyarrow', compression='snappy', index=False)
+    else:
+        df.to_csv(output_path, index=False)
     
     # Statistics
     print("\n" + "-"*70)
@@ -14,6 +14,7 @@ import os
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -73,53 +74,62 @@ def run_simulation_loop(simulator):
         current_date += timedelta(days=1)
     return pd.DataFrame(data)
 
+def _post_ab(df):
+    df['RUL'] = df['RUL'].clip(lower=400)
+
+
+def _post_bc(df):
+    df['RUL'] = df['RUL'] * 0.7
+
+
+def _post_cd(df):
+    # Inject FAILURE (RUL is scaled in place, so it must be float first: pandas
+    # no longer upcasts an int column on a lossy .loc assignment)
+    df['RUL'] = df['RUL'].astype(float)
+    mask_fail = df['day'] > 160
+    df.loc[mask_fail, 'pressure_A'] *= 0.7
+    df.loc[mask_fail, 'pressure_B'] *= 0.4
+    df.loc[mask_fail, 'flow_A'] *= 1.2
+    df.loc[mask_fail, 'flow_B'] *= 0.6
+    df.loc[mask_fail, 'RUL'] *= 0.1
+
+
+def _post_de(df):
+    pass
+
+
 def generate_golden_scenarios():
     output_dir = os.path.join(os.path.dirname(__file__), '..', 'backend', 'data')
     os.makedirs(output_dir, exist_ok=True)
     
     print(f"Generating Golden Scenarios in {output_dir}...")
 
-    # 1. A-B
-    print("Generating A-B...")
-    sim_ab = PipelineDegradationSimulator("slow_corrosion", 730, seed=42, 
-        initial_conditions={'pressure': 5.5, 'flow': 100}, degradation_rates={'corrosion': 0.0005})
-    df_ab = run_simulation_loop(sim_ab)
-    df_ab['scenario_id'] = 'A-B'
-    df_ab['RUL'] = df_ab['RUL'].clip(lower=400)
-    df_ab.to_csv(os.path.join(output_dir, 'history_AB.csv'), index=False)
-
-    # 2. B-C
-    print("Generating B-C...")
-    sim_bc = PipelineDegradationSimulator("fast_corrosion", 730, seed=101, 
-        initial_conditions={'pressure': 5.4, 'flow': 98}, degradation_rates={'corrosion': 0.005})
-    df_bc = run_simulation_loop(sim_bc)
-    df_bc['scenario_id'] = 'B-C'
-    df_bc['RUL'] = df_bc['RUL'] * 0.7
-    df_bc.to_csv(os.path.join(output_dir, 'history_BC.csv'), index=False)
-
-    # 3. C-D
-    print("Generating C-D...")
-    sim_cd = PipelineDegradationSimulator("pressure_surge", 730, seed=666, 
-        initial_conditions={'pressure': 5.2, 'flow': 95})
-    df_cd = run_simulation_loop(sim_cd)
-    df_cd['scenario_id'] = 'C-D'
+    # (segment, simulator, postprocess, file); each simulator carries its own seeded RNG
+    scenarios = [
+        ('A-B', PipelineDegradationSimulator("slow_corrosion", 730, seed=42, 
+            initial_conditions={'pressure': 5.5, 'flow': 100}, degradation_rates={'corrosion': 0.0005}),
+         _post_ab, 'history_AB.csv'),
+        ('B-C', PipelineDegradationSimulator("fast_corrosion", 730, seed=101, 
+            initial_conditions={'pressure': 5.4, 'flow': 98}, degradation_rates={'corrosion': 0.005}),
+         _post_bc, 'history_BC.csv'),
+        ('C-D', PipelineDegradationSimulator("pressure_surge", 730, seed=666, 
+            initial_conditions={'pressure': 5.2, 'flow': 95}),
+         _post_cd, 'history_CD.csv'),
+        ('D-E', PipelineDegradationSimulator("fatigue", 730, seed=99, 
+            initial_conditions={'pressure': 4.8, 'flow': 90}),
+         _post_de, 'history_DE.csv'),
+    ]
+    
+    # The four simulations are independent: run them side by side in worker processes
+    print(f"Simulating {', '.join(name for name, _, _, _ in scenarios)} in parallel...")
+    with ProcessPoolExecutor(max_workers=len(scenarios)) as executor:
+        dfs = list(executor.map(run_simulation_loop, [sim for _, sim, _, _ in scenarios]))
     
-    # Inject FAILURE
-    mask_fail = df_cd['day'] > 160
-    df_cd.loc[mask_fail, 'pressure_A'] *= 0.7
-    df_cd.loc[mask_fail, 'pressure_B'] *= 0.4
-    df_cd.loc[mask_fail, 'flow_A'] *= 1.2
-    df_cd.loc[mask_fail, 'flow_B'] *= 0.6
-    df_cd.loc[mask_fail, 'RUL'] *= 0.1
-    df_cd.to_csv(os.path.join(output_dir, 'history_CD.csv'), index=False)
-
-    # 4. D-E
-    print("Generating D-E...")
-    sim_de = PipelineDegradationSimulator("fatigue", 730, seed=99, 
-        initial_conditions={'pressure': 4.8, 'flow': 90})
-    df_de = run_simulation_loop(sim_de)
-    df_de['scenario_id'] = 'D-E'
-    df_de.to_csv(os.path.join(output_dir, 'history_DE.csv'), index=False)
+    for (name, _, postprocess, filename), df in zip(scenarios, dfs):
+        print(f"Writing {name}...")
+        df['scenario_id'] = name
+        postprocess(df)
+        df.to_csv(os.path.join(output_dir, filename), index=False)
     
     print("Done.")
 
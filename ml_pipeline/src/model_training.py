@@ -5,30 +5,176 @@ Model Training and Evaluation Module
 Trains XGBoost model for RUL prediction with comprehensive evaluation.
 """
 
+import io
+import json
+import os
+import sys
+
+# One OpenMP thread per physical core, kept on neighbouring cores. The
+# runtime reads these when it loads, so they are set before xgboost is
+# imported; values already exported by the caller win.
+os.environ.setdefault('OMP_PLACES', 'cores')
+os.environ.setdefault('OMP_PROC_BIND', 'close')
+
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import xgboost as xgb
 import joblib
-from tqdm import tqdm
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from .metrics import regression_metrics
+except ImportError:
+    # Run as a script (python src/model_training.py)
+    from metrics import regression_metrics
+
+# Below this many training rows the GPU transfer and kernel launch overhead
+# outweighs the faster histogram build, so training stays on the CPU
+GPU_MIN_ROWS = 100_000
+
+# Models used to ship with a fitted StandardScaler; save_model now writes
+# None to this file (see save_model)
+LEGACY_SCALER_FILE = 'feature_scaler.pkl'
+
+# Held-out scenario ids, saved next to the model by save_model
+TEST_SCENARIOS_FILE = 'test_scenarios.npy'
+
+# Feature columns in training order, saved next to the model by save_model
+FEATURE_NAMES_FILE = 'feature_names.json'
+
+# Features shown in the training printout and the importance plot
+TOP_FEATURES = 15
+
+# Scatter plots draw a fixed random subset of at most this many points; more
+# only add draw time without changing how the point cloud looks
+MAX_SCATTER_POINTS = 5000
+
+
+def _group_mask(codes, n_groups, chosen):
+    """Row mask selecting the rows whose group code is in chosen."""
+    lookup = np.zeros(n_groups, dtype=bool)
+    lookup[chosen] = True
+    return lookup[codes]
+
+
+def split_scenarios(n_scenarios, test_size=0.15, val_size=0.15, random_state=42):
+    """
+    Split scenario positions 0..n_scenarios-1 into train/val/test.
+    
+    Returns:
+        tuple: (train_idx, val_idx, test_idx) position arrays
+    """
+    # First split: train+val vs test
+    train_val_idx, test_idx = train_test_split(
+        np.arange(n_scenarios), test_size=test_size, random_state=random_state
+    )
+    
+    # Second split: train vs val
+    val_size_adjusted = val_size / (1 - test_size)
+    train_idx, val_idx = train_test_split(
+        train_val_idx, test_size=val_size_adjusted, random_state=random_state
+    )
+    return train_idx, val_idx, test_idx
+
+
+def scatter_sample(n, max_points=MAX_SCATTER_POINTS):
+    """Index of the points (out of n) a scatter plot draws: all, or a fixed random subset."""
+    if n <= max_points:
+        return slice(None)
+    return np.random.default_rng(0).choice(n, max_points, replace=False)
+
+
+def load_regressor(model_path='models/rul_model.ubj'):
+    """
+    Load a saved RUL regressor.
+    
+    Native .ubj models load straight into an XGBRegressor; when there is none
+    the legacy pickled model (.pkl, same name) is loaded instead.
+    """
+    stem = os.path.splitext(model_path)[0]
+    if os.path.exists(stem + '.ubj'):
+        model = xgb.XGBRegressor()
+        model.load_model(stem + '.ubj')
+        return model
+    return joblib.load(stem + '.pkl')
+
+
+def load_feature_names(model_dir='models', n_features=None):
+    """
+    Feature columns saved with the model, in the order it was trained on.
+    
+    Returns None when there is no saved list, or when it does not hold
+    n_features names (a list left over from a different model).
+    """
+    names_path = os.path.join(model_dir, FEATURE_NAMES_FILE)
+    if not os.path.exists(names_path):
+        return None
+    with open(names_path) as f:
+        names = json.load(f)
+    if n_features is not None and len(names) != n_features:
+        return None
+    return names
+
+
+def load_features(path='data/features_engineered.csv'):
+    """
+    Load the engineered feature table.
+    
+    The CSV is parsed once (features straight to float32) and cached as a
+    Parquet file next to it, so later runs do a typed columnar read instead
+    of re-tokenizing the text. The cache is rebuilt whenever the CSV is newer
+    than it.
+    """
+    cache_path = os.path.splitext(path)[0] + '.parquet'
+    if (os.path.exists(cache_path)
+            and os.path.getmtime(cache_path) >= os.path.getmtime(path)):
+        return pd.read_parquet(cache_path, engine='pyarrow')
+    
+    header = pd.read_csv(path, nrows=0).columns
+    dtype = {col: np.float32 for col in header
+             if col not in ['scenario_id', 'day', 'date', 'RUL']}
+    df = pd.read_csv(path, dtype=dtype, parse_dates=['date'], engine='pyarrow')
+    
+    try:
+        df.to_parquet(cache_path, engine='pyarrow', compression='zstd', index=False)
+    except OSError as e:
+        # Read-only checkouts still work, they just parse the CSV every run
+        print(f"Warning: could not write Parquet cache {cache_path}: {e}")
+    return df
+
 
 class RULPredictor:
     """
     XGBoost-based RUL prediction model with comprehensive training and evaluation.
     """
     
-    def __init__(self):
+    def __init__(self, use_gpu=False, n_jobs=None, grow_policy='lossguide', max_leaves=128):
+        """
+        Args:
+            use_gpu: Train on a CUDA device when the training set is large
+                enough (see GPU_MIN_ROWS)
+            n_jobs: XGBoost threads; defaults to the number of physical
+                cores, since hyper-threads only contend for the same
+                histogram cache lines
+            grow_policy: 'lossguide' splits the highest-gain leaf first,
+                capped by max_leaves with no depth limit; 'depthwise' grows
+                level by level to depth 8
+            max_leaves: Leaf cap per tree (0 = none; depthwise with 0 is the
+                former depth-8 configuration)
+        """
+        self.use_gpu = use_gpu
+        self.n_jobs = n_jobs or joblib.cpu_count(only_physical_cores=True)
+        self.grow_policy = grow_policy
+        self.max_leaves = max_leaves
         self.model = None
-        self.scaler = StandardScaler()
         self.feature_names = None
         self.feature_importance = None
+        self.top_features = None
+        self.test_scenarios = None
         
     def prepare_data(self, df, test_size=0.15, val_size=0.15, random_state=42):
         """
@@ -51,7 +197,10 @@ class RULPredictor:
         feature_cols = [col for col in df.columns 
                        if col not in ['scenario_id', 'day', 'date', 'RUL']]
         
-        X = df[feature_cols].values
+        # One contiguous float32 block: half the bandwidth of float64, and
+        # XGBoost bins the values anyway. No scaling: tree splits only
+        # depend on the order of each feature's values
+        X = np.ascontiguousarray(df[feature_cols].to_numpy(dtype=np.float32, copy=False))
         y = df['RUL'].values
         self.feature_names = feature_cols
         
@@ -59,25 +208,23 @@ class RULPredictor:
         print(f"Samples:  {len(X):,}")
         print(f"Target range: {y.min()} to {y.max()} days")
         
-        # Split by scenario to prevent data leakage
+        # Split by scenario to prevent data leakage. Scenarios are
+        # factorized once so each split is a bitmap lookup on integer codes
         print("\nSplitting data by scenario (prevent leakage)...")
-        scenarios = df['scenario_id'].unique()
-        
-        # First split: train+val vs test
-        train_val_scenarios, test_scenarios = train_test_split(
-            scenarios, test_size=test_size, random_state=random_state
-        )
-        
-        # Second split: train vs val
-        val_size_adjusted = val_size / (1 - test_size)
-        train_scenarios, val_scenarios = train_test_split(
-            train_val_scenarios, test_size=val_size_adjusted, random_state=random_state
+        codes, scenarios = pd.factorize(df['scenario_id'].to_numpy())
+        train_idx, val_idx, test_idx = split_scenarios(
+            len(scenarios), test_size=test_size, val_size=val_size, random_state=random_state
         )
+        train_scenarios = scenarios[train_idx]
+        val_scenarios = scenarios[val_idx]
+        test_scenarios = scenarios[test_idx]
+        # Persisted by save_model so test_model evaluates the same held-out set
+        self.test_scenarios = test_scenarios
         
         # Create masks
-        train_mask = df['scenario_id'].isin(train_scenarios)
-        val_mask = df['scenario_id'].isin(val_scenarios)
-        test_mask = df['scenario_id'].isin(test_scenarios)
+        train_mask = _group_mask(codes, len(scenarios), train_idx)
+        val_mask = _group_mask(codes, len(scenarios), val_idx)
+        test_mask = _group_mask(codes, len(scenarios), test_idx)
         
         # Split data
         X_train, y_train = X[train_mask], y[train_mask]
@@ -88,12 +235,6 @@ class RULPredictor:
         print(f"Val scenarios:   {len(val_scenarios):4d} ({len(X_val):,} samples)")
         print(f"Test scenarios:  {len(test_scenarios):4d} ({len(X_test):,} samples)")
         
-        # Scale features
-        print("\nScaling features...")
-        X_train = self.scaler.fit_transform(X_train)
-        X_val = self.scaler.transform(X_val)
-        X_test = self.scaler.transform(X_test)
-        
         print("="*70 + "\n")
         
         return X_train, X_val, X_test, y_train, y_val, y_test
@@ -116,7 +257,13 @@ class RULPredictor:
         params = {
             'objective': 'reg:squarederror',
             'n_estimators': 1000,
-            'max_depth': 8,
+            # Histogram split finding: features are binned once up front
+            # and the bins reused by every boosting round
+            'tree_method': 'hist',
+            'max_bin': 256,
+            'grow_policy': self.grow_policy,
+            'max_leaves': self.max_leaves,
+            'max_depth': 0 if self.grow_policy == 'lossguide' else 8,
             'learning_rate': 0.03,
             'subsample': 0.8,
             'colsample_bytree': 0.8,
@@ -125,46 +272,76 @@ class RULPredictor:
             'reg_alpha': 0.1,
             'reg_lambda': 1.0,
             'random_state': 42,
-            'n_jobs': -1,
+            'n_jobs': self.n_jobs,
+            'eval_metric': 'mae',
             'verbosity': 0
         }
         
-        print("\nXGBoost Parameters:")
+        # Offload histogram building to the GPU for large tables only
+        if self.use_gpu and len(X_train) >= GPU_MIN_ROWS:
+            params['device'] = 'cuda'
+        elif self.use_gpu:
+            print(f"\n{len(X_train):,} training rows < {GPU_MIN_ROWS:,}, training on CPU")
+        
+        # Report sections are built in a buffer and written out in one call
+        buf = io.StringIO()
+        buf.write("\nXGBoost Parameters:\n")
         for key, value in params.items():
-            print(f"  {key:20s}: {value}")
+            buf.write(f"  {key:20s}: {value}\n")
+        sys.stdout.write(buf.getvalue())
         
-        # Create model
+        # Create model (holds the parameters; the booster is trained below)
         self.model = xgb.XGBRegressor(**params)
         
+        # Quantized inputs: the training matrix keeps only the bin index of
+        # each value, and the validation matrix reuses its quantile cuts
+        dtrain = xgb.QuantileDMatrix(X_train, y_train, max_bin=params['max_bin'],
+                                     nthread=self.n_jobs)
+        dval = xgb.QuantileDMatrix(X_val, y_val, ref=dtrain, nthread=self.n_jobs)
+        
         # Train with early stopping
         print("\nTraining with early stopping (patience=50)...")
         print("Progress:")
         
-        self.model.fit(
-            X_train, y_train,
-            eval_set=[(X_train, y_train), (X_val, y_val)],
-            eval_metric='mae',
+        results = {}
+        booster = xgb.train(
+            self.model.get_xgb_params(), dtrain,
+            num_boost_round=params['n_estimators'],
+            evals=[(dtrain, 'train'), (dval, 'val')],
             early_stopping_rounds=50,
-            verbose=False
+            evals_result=results,
+            verbose_eval=False
         )
         
+        # Hand the booster to the sklearn wrapper: predict (at the best
+        # iteration), feature_importances_ and the pickled model stay as before
+        self.model.load_model(booster.save_raw())
+        
         # Get training history
-        results = self.model.evals_result()
-        train_mae = results['validation_0']['mae']
-        val_mae = results['validation_1']['mae']
+        train_mae = results['train']['mae']
+        val_mae = results['val']['mae']
         
         print(f"\nBest iteration: {self.model.best_iteration}")
         print(f"Best val MAE:   {self.model.best_score:.2f} days")
         
-        # Calculate feature importance
+        # Calculate feature importance (full table, in feature order)
+        importance = self.model.feature_importances_
         self.feature_importance = pd.DataFrame({
             'feature': self.feature_names,
-            'importance': self.model.feature_importances_
-        }).sort_values('importance', ascending=False)
+            'importance': importance
+        })
+        
+        # Only the top features are printed/plotted: partial sort for those
+        k = min(TOP_FEATURES, len(importance))
+        top_idx = np.argpartition(-importance, k - 1)[:k]
+        top_idx = top_idx[np.argsort(-importance[top_idx], kind='stable')]
+        self.top_features = self.feature_importance.iloc[top_idx]
         
-        print("\nTop 10 Most Important Features:")
-        for idx, row in self.feature_importance.head(10).iterrows():
-            print(f"  {row['feature']:40s}: {row['importance']:.4f}")
+        buf = io.StringIO()
+        buf.write("\nTop 10 Most Important Features:\n")
+        for row in self.top_features.head(10).itertuples(index=False):
+            buf.write(f"  {row.feature:40s}: {row.importance:.4f}\n")
+        sys.stdout.write(buf.getvalue())
         
         print("="*70 + "\n")
         
@@ -187,52 +364,36 @@ class RULPredictor:
         print("\nMaking predictions on test set...")
         y_pred = self.model.predict(X_test)
         
-        # Calculate metrics
-        mae = mean_absolute_error(y_test, y_pred)
-        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-        r2 = r2_score(y_test, y_pred)
-        
-        # Calculate accuracy (within ±10 days)
-        within_10_days = np.abs(y_test - y_pred) <= 10
-        accuracy_10d = within_10_days.mean() * 100
-        
-        # Calculate accuracy (within ±5 days)
-        within_5_days = np.abs(y_test - y_pred) <= 5
-        accuracy_5d = within_5_days.mean() * 100
-        
-        print("\n" + "-"*70)
-        print("TEST SET PERFORMANCE")
-        print("-"*70)
-        print(f"MAE (Mean Absolute Error):     {mae:.2f} days")
-        print(f"RMSE (Root Mean Squared Error): {rmse:.2f} days")
-        print(f"R² Score:                       {r2:.4f}")
-        print(f"Accuracy (±10 days):            {accuracy_10d:.1f}%")
-        print(f"Accuracy (±5 days):             {accuracy_5d:.1f}%")
-        print("-"*70)
-        
-        # Error distribution
-        errors = y_test - y_pred
-        print(f"\nError Statistics:")
-        print(f"  Mean error:   {errors.mean():.2f} days")
-        print(f"  Std error:    {errors.std():.2f} days")
-        print(f"  Min error:    {errors.min():.2f} days")
-        print(f"  Max error:    {errors.max():.2f} days")
-        print(f"  Median error: {np.median(errors):.2f} days")
+        # Calculate metrics (one fused pass over y_test/y_pred)
+        m = regression_metrics(y_test, y_pred)
+        
+        buf = io.StringIO()
+        buf.write("\n" + "-"*70 + "\n")
+        buf.write("TEST SET PERFORMANCE\n")
+        buf.write("-"*70 + "\n")
+        buf.write(f"MAE (Mean Absolute Error):     {m['MAE']:.2f} days\n")
+        buf.write(f"RMSE (Root Mean Squared Error): {m['RMSE']:.2f} days\n")
+        buf.write(f"R² Score:                       {m['R2']:.4f}\n")
+        buf.write(f"Accuracy (±10 days):            {m['Accuracy_10d']:.1f}%\n")
+        buf.write(f"Accuracy (±5 days):             {m['Accuracy_5d']:.1f}%\n")
+        buf.write("-"*70 + "\n")
+        
+        # Error distribution (the median needs the errors themselves)
+        buf.write("\nError Statistics:\n")
+        buf.write(f"  Mean error:   {m['Mean_Error']:.2f} days\n")
+        buf.write(f"  Std error:    {m['Std_Error']:.2f} days\n")
+        buf.write(f"  Min error:    {m['Min_Error']:.2f} days\n")
+        buf.write(f"  Max error:    {m['Max_Error']:.2f} days\n")
+        buf.write(f"  Median error: {np.median(y_test - y_pred):.2f} days\n")
+        sys.stdout.write(buf.getvalue())
         
         # Create visualizations
         print("\nCreating evaluation plots...")
         self._create_evaluation_plots(y_test, y_pred, save_path)
         
         # Save metrics
-        metrics = {
-            'MAE': mae,
-            'RMSE': rmse,
-            'R2': r2,
-            'Accuracy_10d': accuracy_10d,
-            'Accuracy_5d': accuracy_5d,
-            'Mean_Error': errors.mean(),
-            'Std_Error': errors.std()
-        }
+        metrics = {key: m[key] for key in
+                   ('MAE', 'RMSE', 'R2', 'Accuracy_10d', 'Accuracy_5d', 'Mean_Error', 'Std_Error')}
         
         metrics_df = pd.DataFrame([metrics])
         metrics_df.to_csv(f'{save_path}evaluation_metrics.csv', index=False)
@@ -246,10 +407,14 @@ class RULPredictor:
         """Create comprehensive evaluation visualizations."""
         
         fig, axes = plt.subplots(2, 2, figsize=(15, 12))
+        errors = y_test - y_pred
+        
+        # Scatters draw a subset, rasterized (one image instead of a path per marker)
+        idx = scatter_sample(len(y_test))
         
         # 1. Predictions vs Actual
         ax = axes[0, 0]
-        ax.scatter(y_test, y_pred, alpha=0.3, s=10)
+        ax.scatter(y_test[idx], y_pred[idx], alpha=0.3, s=10, rasterized=True)
         ax.plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()], 
                 'r--', lw=2, label='Perfect Prediction')
         ax.set_xlabel('Actual RUL (days)', fontsize=12)
@@ -260,8 +425,8 @@ class RULPredictor:
         
         # 2. Error Distribution
         ax = axes[0, 1]
-        errors = y_test - y_pred
-        ax.hist(errors, bins=50, edgecolor='black', alpha=0.7)
+        counts, edges = np.histogram(errors, bins=50)
+        ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', edgecolor='black', alpha=0.7)
         ax.axvline(0, color='r', linestyle='--', lw=2, label='Zero Error')
         ax.set_xlabel('Prediction Error (days)', fontsize=12)
         ax.set_ylabel('Frequency', fontsize=12)
@@ -271,7 +436,7 @@ class RULPredictor:
         
         # 3. Residual Plot
         ax = axes[1, 0]
-        ax.scatter(y_pred, errors, alpha=0.3, s=10)
+        ax.scatter(y_pred[idx], errors[idx], alpha=0.3, s=10, rasterized=True)
         ax.axhline(0, color='r', linestyle='--', lw=2)
         ax.set_xlabel('Predicted RUL (days)', fontsize=12)
         ax.set_ylabel('Residual (days)', fontsize=12)
@@ -280,7 +445,7 @@ class RULPredictor:
         
         # 4. Feature Importance (Top 15)
         ax = axes[1, 1]
-        top_features = self.feature_importance.head(15)
+        top_features = self.top_features
         ax.barh(range(len(top_features)), top_features['importance'])
         ax.set_yticks(range(len(top_features)))
         ax.set_yticklabels(top_features['feature'], fontsize=9)
@@ -290,42 +455,54 @@ class RULPredictor:
         ax.invert_yaxis()
         
         plt.tight_layout()
-        plt.savefig(f'{save_path}evaluation_plots.png', dpi=150, bbox_inches='tight')
+        plt.savefig(f'{save_path}evaluation_plots.png', dpi=100, bbox_inches='tight')
         print(f"  Plots saved to {save_path}evaluation_plots.png")
         plt.close()
     
-    def save_model(self, model_path='models/rul_model.pkl', 
-                   scaler_path='models/feature_scaler.pkl'):
-        """Save trained model and scaler."""
+    def save_model(self, model_path='models/rul_model.ubj'):
+        """Save trained model in XGBoost's native UBJSON format (.ubj)."""
+        model_path = os.path.splitext(model_path)[0] + '.ubj'
         print(f"\nSaving model to {model_path}...")
-        joblib.dump(self.model, model_path)
+        self.model.save_model(model_path)
+        
+        # Models are trained on unscaled features. An empty scaler file
+        # replaces any stale one next to the model, so loaders that still
+        # read it pass features through untransformed
+        scaler_path = os.path.join(os.path.dirname(model_path), LEGACY_SCALER_FILE)
+        joblib.dump(None, scaler_path)
+        
+        if self.feature_names is not None:
+            names_path = os.path.join(os.path.dirname(model_path), FEATURE_NAMES_FILE)
+            with open(names_path, 'w') as f:
+                json.dump(self.feature_names, f, indent=2)
         
-        print(f"Saving scaler to {scaler_path}...")
-        joblib.dump(self.scaler, scaler_path)
+        if self.test_scenarios is not None:
+            manifest_path = os.path.join(os.path.dirname(model_path), TEST_SCENARIOS_FILE)
+            print(f"Saving test split to {manifest_path}...")
+            np.save(manifest_path, np.asarray(self.test_scenarios))
         
-        print("Model and scaler saved successfully!")
+        print("Model saved successfully!")
     
-    def load_model(self, model_path='models/rul_model.pkl',
-                   scaler_path='models/feature_scaler.pkl'):
-        """Load trained model and scaler."""
-        self.model = joblib.load(model_path)
-        self.scaler = joblib.load(scaler_path)
+    def load_model(self, model_path='models/rul_model.ubj'):
+        """Load trained model (.ubj, or a legacy pickled .pkl)."""
+        self.model = load_regressor(model_path)
         print(f"Model loaded from {model_path}")
 
 
-def train_and_evaluate(features_path='data/features_engineered.csv'):
+def train_and_evaluate(features_path='data/features_engineered.csv', use_gpu=False):
     """
     Main training pipeline.
     
     Args:
         features_path: Path to engineered features
+        use_gpu: Train on a CUDA device for large feature tables
     """
     # Load features
     print(f"\nLoading features from {features_path}...")
-    df = pd.read_csv(features_path, parse_dates=['date'])
+    df = load_features(features_path)
     
     # Initialize predictor
-    predictor = RULPredictor()
+    predictor = RULPredictor(use_gpu=use_gpu)
     
     # Prepare data
     X_train, X_val, X_test, y_train, y_val, y_test = predictor.prepare_data(df)
@@ -340,7 +517,8 @@ def train_and_evaluate(features_path='data/features_engineered.csv'):
     predictor.save_model()
     
     # Save feature importance
-    predictor.feature_importance.to_csv('results/feature_importance.csv', index=False)
+    predictor.feature_importance.sort_values('importance', ascending=False).to_csv(
+        'results/feature_importance.csv', index=False)
     print("\nFeature importance saved to results/feature_importance.csv")
     
     return predictor, metrics
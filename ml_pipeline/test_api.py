@@ -1,24 +1,55 @@
+import sys
+import time
 import requests
+from requests.adapters import HTTPAdapter
 import json
 
+# orjson is optional: faster decoding and pretty-printing of the response
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+API_URL = 'http://localhost:8000/api/health'
+
+# Requests to issue (python test_api.py 10 for a repeated check), one by default
+N_RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+
+# One keep-alive connection reused by every request instead of a new TCP
+# connection per call
+session = requests.Session()
+session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
 print("="*60)
 print("TESTING BACKEND API")
 print("="*60)
 
-try:
-    response = requests.get('http://localhost:8000/api/health')
-    data = response.json()
-    
-    print("\nAPI Response:")
-    print(json.dumps(data, indent=2))
-    
-    print("\n" + "="*60)
-    print("HEALTH SCORES FROM API:")
-    print("="*60)
-    
-    for seg_id, seg_data in data.items():
-        if isinstance(seg_data, dict) and 'health_score' in seg_data:
-            print(f"{seg_id}: {seg_data['health_score']}% (RUL: {seg_data.get('rul', 'N/A')})")
-    
-except Exception as e:
-    print(f"Error: {e}")
+for run in range(N_RUNS):
+    try:
+        start = time.perf_counter()
+        response = session.get(API_URL)
+        if orjson is not None:
+            data = orjson.loads(response.content)
+        else:
+            data = response.json()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if N_RUNS > 1:
+            print(f"\nRequest {run + 1}/{N_RUNS}: {elapsed_ms:.1f} ms")
+
+        print("\nAPI Response:")
+        if orjson is not None:
+            print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
+        else:
+            print(json.dumps(data, indent=2))
+
+        print("\n" + "="*60)
+        print("HEALTH SCORES FROM API:")
+        print("="*60)
+
+        for seg_id, seg_data in data.items():
+            if isinstance(seg_data, dict) and 'health_score' in seg_data:
+                print(f"{seg_id}: {seg_data['health_score']}% (RUL: {seg_data.get('rul', 'N/A')})")
+
+    except Exception as e:
+        print(f"Error: {e}")
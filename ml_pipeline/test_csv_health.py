@@ -1,7 +1,7 @@
 import pandas as pd
 import sys
 sys.path.insert(0, 'backend')
-from utils import calculate_health_score
+from utils import health_score_ab, health_score_bc, health_score_cd, health_score_de
 
 # Check what RUL values are in CSV at Day 180
 print("="*60)
@@ -10,15 +10,19 @@ print("="*60)
 
 segments = ['AB', 'BC', 'CD', 'DE']
 seg_map = {'AB': 'A-B', 'BC': 'B-C', 'CD': 'C-D', 'DE': 'D-E'}
+# Each file is one known segment, so use that segment's pre-bound score function
+score_fns = {'AB': health_score_ab, 'BC': health_score_bc, 'CD': health_score_cd, 'DE': health_score_de}
 
 for seg_file in segments:
-    df = pd.read_csv(f'backend/data/history_{seg_file}.csv')
-    day180 = df[df['day'] == 180]
+    # Only day and RUL are needed, so the sensor dict columns (the bulk of
+    # each file) are never parsed
+    df = pd.read_csv(f'backend/data/history_{seg_file}.csv', usecols=['day', 'RUL'])
+    day180 = df['RUL'].to_numpy()[df['day'].to_numpy() == 180]
     
-    if not day180.empty:
-        rul_value = day180['RUL'].values[0]
+    if len(day180):
+        rul_value = day180[0]
         seg_id = seg_map[seg_file]
-        health = calculate_health_score(rul_value, seg_id)
+        health = score_fns[seg_file](rul_value)
         
         print(f"\n{seg_id}:")
         print(f"  RUL at Day 180: {rul_value}")
@@ -6,12 +6,15 @@ Loads the trained model and demonstrates predictions on test data.
 Shows detailed results with visualizations.
 """
 
+import os
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import joblib
 from datetime import datetime, timedelta
+from src.metrics import regression_metrics
+from src.model_training import (TEST_SCENARIOS_FILE, load_feature_names, load_features,
+                                load_regressor, scatter_sample, split_scenarios)
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -19,6 +22,9 @@ warnings.filterwarnings('ignore')
 sns.set_style("whitegrid")
 plt.rcParams['figure.figsize'] = (16, 10)
 
+# Rows predicted per model.predict call in make_predictions
+PREDICT_CHUNK_ROWS = 65536
+
 def load_model_and_data():
     """Load trained model, scaler, and test data."""
     print("\n" + "="*70)
@@ -27,28 +33,36 @@ def load_model_and_data():
     
     # Load model and scaler
     print("\nLoading trained model...")
-    model = joblib.load('models/rul_model.pkl')
+    model = load_regressor('models/rul_model.ubj')
     scaler = joblib.load('models/feature_scaler.pkl')
     print(f"[OK] Model loaded: {type(model).__name__}")
-    print(f"[OK] Number of trees: {model.n_estimators}")
+    print(f"[OK] Number of trees: {model.get_booster().num_boosted_rounds()}")
     
     # Load features
     print("\nLoading feature data...")
-    df = pd.read_csv('data/features_engineered.csv', parse_dates=['date'])
+    df = load_features('data/features_engineered.csv')
     print(f"[OK] Total samples: {len(df):,}")
     
-    # Get feature columns
-    feature_cols = [col for col in df.columns 
-                   if col not in ['scenario_id', 'day', 'date', 'RUL']]
-    
-    # Split by scenario (same as training)
-    scenarios = df['scenario_id'].unique()
+    # Get feature columns: the schema saved with the model, so no column
+    # filtering and the order is the model's. Without a matching saved list,
+    # every non-metadata column is a feature
+    feature_cols = load_feature_names('models', model.n_features_in_)
+    if feature_cols is None or not set(feature_cols).issubset(df.columns):
+        feature_cols = [col for col in df.columns 
+                       if col not in ['scenario_id', 'day', 'date', 'RUL']]
+    
+    # Test scenarios: the held-out set saved with the model. Models saved
+    # without it get the training split recomputed (same seed and sizes)
+    manifest_path = os.path.join('models', TEST_SCENARIOS_FILE)
+    if os.path.exists(manifest_path):
+        test_scenarios = np.load(manifest_path)
+    else:
+        scenarios = df['scenario_id'].unique()
+        test_scenarios = scenarios[split_scenarios(len(scenarios))[2]]
+    
+    # Seeded as before, so the sample predictions shown later are reproducible
     np.random.seed(42)
     
-    # Get test scenarios (same split as training)
-    train_val_scenarios = np.random.choice(scenarios, size=int(len(scenarios)*0.85), replace=False)
-    test_scenarios = [s for s in scenarios if s not in train_val_scenarios]
-    
     # Get test data
     test_df = df[df['scenario_id'].isin(test_scenarios)].copy()
     X_test = test_df[feature_cols].values
@@ -67,11 +81,23 @@ def make_predictions(model, scaler, X_test):
     print("MAKING PREDICTIONS")
     print("="*70)
     
-    print("\nScaling features...")
-    X_test_scaled = scaler.transform(X_test)
+    # Predict in row chunks so only one chunk's working copy is alive at a
+    # time. Current models take raw features; legacy models also ship a fitted
+    # scaler, applied in place to a reused chunk buffer
+    n = len(X_test)
+    y_pred = np.empty(n, dtype=np.float32)
+    if scaler is not None:
+        print("\nScaling features...")
+        buf = np.empty((min(PREDICT_CHUNK_ROWS, n), X_test.shape[1]), dtype=X_test.dtype)
     
     print("Generating predictions...")
-    y_pred = model.predict(X_test_scaled)
+    for start in range(0, n, PREDICT_CHUNK_ROWS):
+        chunk = X_test[start:start + PREDICT_CHUNK_ROWS]
+        if scaler is not None:
+            chunk_buf = buf[:len(chunk)]
+            np.copyto(chunk_buf, chunk)
+            chunk = scaler.transform(chunk_buf, copy=False)
+        y_pred[start:start + len(chunk)] = model.predict(chunk)
     
     print(f"[OK] Predictions complete!")
     print(f"  Predicted RUL range: {y_pred.min():.1f} to {y_pred.max():.1f} days")
@@ -85,20 +111,12 @@ def analyze_results(y_test, y_pred):
     print("PREDICTION ANALYSIS")
     print("="*70)
     
-    # Calculate metrics
-    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-    
-    mae = mean_absolute_error(y_test, y_pred)
-    rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-    r2 = r2_score(y_test, y_pred)
+    # Calculate metrics (one fused pass over y_test/y_pred)
+    m = regression_metrics(y_test, y_pred)
+    mae, rmse, r2 = m['MAE'], m['RMSE'], m['R2']
     
     errors = y_test - y_pred
     
-    # Accuracy metrics
-    within_5 = (np.abs(errors) <= 5).mean() * 100
-    within_10 = (np.abs(errors) <= 10).mean() * 100
-    within_20 = (np.abs(errors) <= 20).mean() * 100
-    
     print("\n" + "-"*70)
     print("PERFORMANCE METRICS")
     print("-"*70)
@@ -106,15 +124,15 @@ def analyze_results(y_test, y_pred):
     print(f"RMSE (Root Mean Squared Error): {rmse:.2f} days")
     print(f"R² Score:                       {r2:.4f}")
     print(f"\nAccuracy:")
-    print(f"  Within ±5 days:   {within_5:.1f}%")
-    print(f"  Within ±10 days:  {within_10:.1f}%")
-    print(f"  Within ±20 days:  {within_20:.1f}%")
+    print(f"  Within ±5 days:   {m['Accuracy_5d']:.1f}%")
+    print(f"  Within ±10 days:  {m['Accuracy_10d']:.1f}%")
+    print(f"  Within ±20 days:  {m['Accuracy_20d']:.1f}%")
     
     print(f"\nError Statistics:")
-    print(f"  Mean error:       {errors.mean():.2f} days")
-    print(f"  Std deviation:    {errors.std():.2f} days")
-    print(f"  Min error:        {errors.min():.2f} days")
-    print(f"  Max error:        {errors.max():.2f} days")
+    print(f"  Mean error:       {m['Mean_Error']:.2f} days")
+    print(f"  Std deviation:    {m['Std_Error']:.2f} days")
+    print(f"  Min error:        {m['Min_Error']:.2f} days")
+    print(f"  Max error:        {m['Max_Error']:.2f} days")
     print(f"  Median error:     {np.median(errors):.2f} days")
     print("-"*70)
     
@@ -142,23 +160,33 @@ def show_sample_predictions(test_df, y_pred, n_samples=20):
     ))
     print("-"*80)
     
-    for idx, row in sample_df.iterrows():
-        status = "[OK]" if abs(row['Error']) <= 10 else "[X]"
+    # Dates formatted in one vectorized call; rows read as plain tuples
+    dates = sample_df['date'].dt.strftime('%Y-%m-%d').to_numpy()
+    for date, row in zip(dates, sample_df.itertuples(index=False)):
+        status = "[OK]" if abs(row.Error) <= 10 else "[X]"
         print("{:<8} {:<12} {:<10.0f} {:<10.0f} {:>6.1f} days {} {:<10.2f} {:<10.4f}".format(
-            row['scenario_id'],
-            row['date'].strftime('%Y-%m-%d'),
-            row['RUL'],
-            row['Predicted_RUL'],
-            row['Error'],
+            row.scenario_id,
+            date,
+            row.RUL,
+            row.Predicted_RUL,
+            row.Error,
             status,
-            row['pressure_A'],
-            row['corrosion_B']
+            row.pressure_A,
+            row.corrosion_B
         ))
     
     print("\n[OK] = Error within ±10 days")
     print("[X] = Error exceeds ±10 days")
 
 
+def _sorted_percentiles(sorted_values, q):
+    """np.percentile (linear interpolation) of already-sorted values, without sorting them again."""
+    pos = np.asarray(q) / 100 * (len(sorted_values) - 1)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
 def create_visualizations(y_test, y_pred, errors):
     """Create comprehensive visualizations."""
     print("\n" + "="*70)
@@ -167,10 +195,17 @@ def create_visualizations(y_test, y_pred, errors):
     
     fig = plt.figure(figsize=(18, 12))
     
+    # Absolute errors sorted once, shared by the box and cumulative plots
+    order = np.argsort(np.abs(errors), kind='stable')
+    sorted_abs_errors = np.abs(errors)[order]
+    
+    # Scatters draw a subset, rasterized (one image instead of a path per marker)
+    idx = scatter_sample(len(y_test))
+    
     # 1. Predictions vs Actual (Large plot)
     ax1 = plt.subplot(2, 3, (1, 4))
-    ax1.scatter(y_test, y_pred, alpha=0.4, s=20, c=errors, cmap='RdYlGn_r', 
-                vmin=-20, vmax=20, edgecolors='black', linewidth=0.5)
+    ax1.scatter(y_test[idx], y_pred[idx], alpha=0.4, s=20, c=errors[idx], cmap='RdYlGn_r', 
+                vmin=-20, vmax=20, edgecolors='black', linewidth=0.5, rasterized=True)
     ax1.plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()], 
              'r--', lw=3, label='Perfect Prediction', zorder=5)
     
@@ -190,7 +225,9 @@ def create_visualizations(y_test, y_pred, errors):
     
     # 2. Error Distribution
     ax2 = plt.subplot(2, 3, 2)
-    ax2.hist(errors, bins=50, edgecolor='black', alpha=0.7, color='steelblue')
+    counts, edges = np.histogram(errors, bins=50)
+    ax2.bar(edges[:-1], counts, width=np.diff(edges), align='edge',
+            edgecolor='black', alpha=0.7, color='steelblue')
     ax2.axvline(0, color='red', linestyle='--', lw=2, label='Zero Error')
     ax2.axvline(errors.mean(), color='green', linestyle='--', lw=2, 
                 label=f'Mean: {errors.mean():.2f}')
@@ -202,22 +239,31 @@ def create_visualizations(y_test, y_pred, errors):
     
     # 3. Error by RUL Range
     ax3 = plt.subplot(2, 3, 3)
-    rul_bins = [0, 50, 100, 200, 400, 800]
+    rul_bins = np.array([0, 50, 100, 200, 400, 800])
     rul_labels = ['0-50', '50-100', '100-200', '200-400', '400+']
-    rul_categories = pd.cut(y_test, bins=rul_bins, labels=rul_labels)
     
-    error_by_rul = pd.DataFrame({'RUL_Range': rul_categories, 'Error': np.abs(errors)})
-    error_by_rul.boxplot(column='Error', by='RUL_Range', ax=ax3)
+    # Bin k holds RUL in (rul_bins[k], rul_bins[k+1]] (as pd.cut did); each box
+    # is drawn from its 5/25/50/75/95th percentiles, whiskers at 5 and 95.
+    # Masking the globally sorted errors keeps each bin's errors sorted, so
+    # the percentiles are read off by index instead of re-sorting per bin
+    sorted_rul_idx = np.digitize(y_test, rul_bins, right=True)[order] - 1
+    box_stats = []
+    for k, label in enumerate(rul_labels):
+        bin_errors = sorted_abs_errors[sorted_rul_idx == k]
+        if len(bin_errors) == 0:
+            continue
+        p5, q1, med, q3, p95 = _sorted_percentiles(bin_errors, [5, 25, 50, 75, 95])
+        box_stats.append({'label': label, 'whislo': p5, 'q1': q1, 'med': med,
+                          'q3': q3, 'whishi': p95})
+    ax3.bxp(box_stats, showfliers=False)
     ax3.set_xlabel('RUL Range (days)', fontsize=12, fontweight='bold')
     ax3.set_ylabel('Absolute Error (days)', fontsize=12, fontweight='bold')
     ax3.set_title('Error by RUL Range', fontsize=14, fontweight='bold')
     plt.sca(ax3)
     plt.xticks(rotation=45)
-    ax3.get_figure().suptitle('')  # Remove default title
     
     # 4. Cumulative Error Distribution
     ax4 = plt.subplot(2, 3, 5)
-    sorted_abs_errors = np.sort(np.abs(errors))
     cumulative = np.arange(1, len(sorted_abs_errors) + 1) / len(sorted_abs_errors) * 100
     ax4.plot(sorted_abs_errors, cumulative, linewidth=2, color='darkblue')
     ax4.axvline(5, color='green', linestyle='--', alpha=0.7, label='±5 days')
@@ -232,7 +278,8 @@ def create_visualizations(y_test, y_pred, errors):
     
     # 5. Residual Plot
     ax5 = plt.subplot(2, 3, 6)
-    ax5.scatter(y_pred, errors, alpha=0.4, s=20, edgecolors='black', linewidth=0.5)
+    ax5.scatter(y_pred[idx], errors[idx], alpha=0.4, s=20, edgecolors='black', linewidth=0.5,
+                rasterized=True)
     ax5.axhline(0, color='red', linestyle='--', lw=2)
     ax5.axhline(10, color='orange', linestyle=':', alpha=0.5)
     ax5.axhline(-10, color='orange', linestyle=':', alpha=0.5)